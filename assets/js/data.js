@@ -0,0 +1,29 @@
+// Loads data files through the content-hashed copies listed in data/published.json.
+// The hashed names change only when the data does, so browsers can cache them for
+// long; the plain data/<name> file is used when there is no manifest entry.
+let publishedManifest = null;
+
+function loadPublishedManifest() {
+    if (!publishedManifest) {
+        publishedManifest = fetch('data/published.json', { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : {})
+            .catch(() => ({}));
+    }
+    return publishedManifest;
+}
+
+async function fetchData(name) {
+    const manifest = await loadPublishedManifest();
+    const entry = manifest[name];
+    if (entry) {
+        try {
+            const response = await fetch(`data/${entry.path}`);
+            if (response.ok) {
+                return response;
+            }
+        } catch (error) {
+            console.error(`Error loading ${entry.path}:`, error);
+        }
+    }
+    return fetch(`data/${name}`);
+}
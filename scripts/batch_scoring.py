@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Batch Scoring
+Vectorised quality score and featured status for a whole repository set
+"""
+
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Trailing UTC designator or offset; the per-repo scorer compares wall-clock times
+_TIMEZONE_SUFFIX = r'(Z|[+-]\d{2}:?\d{2})$'
+
+def days_since_push(pushed_at: pd.Series, now: datetime) -> pd.Series:
+    """Whole days between each ``pushed_at`` and ``now`` (NaN where missing or invalid)."""
+    wall_clock = pushed_at.fillna('').astype(str).str.replace(_TIMEZONE_SUFFIX, '', regex=True)
+    parsed = pd.to_datetime(wall_clock, format='ISO8601', errors='coerce')
+    reference = pd.Timestamp(now.replace(tzinfo=None))
+    # Floor division matches timedelta.days, including for future timestamps
+    return (reference - parsed) // pd.Timedelta(days=1)
+
+def scoring_frame(repositories: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Load the scoring inputs of every repository into columns."""
+    return pd.DataFrame({
+        'stars': [repo.get('stargazers_count', 0) or 0 for repo in repositories],
+        'pushed_at': [repo.get('pushed_at') or None for repo in repositories],
+        'has_readme': [bool(repo.get('has_readme')) for repo in repositories],
+        'description_length': [len(repo.get('description') or '') for repo in repositories],
+        'has_language': [bool(repo.get('language')) for repo in repositories],
+        'has_topics': [bool(repo.get('topics')) for repo in repositories],
+        'size': [repo.get('size', 0) or 0 for repo in repositories],
+        'has_license': [bool(repo.get('license')) for repo in repositories]
+    })
+
+def score_repositories(repositories: List[Dict[str, Any]], now: datetime) -> Tuple[List[int], List[bool]]:
+    """Compute quality scores and featured flags for all repositories at once.
+
+    Applies the same rules as ``NHSWalesRepositoryFetcher.calculate_quality_score``
+    and ``determine_featured_status`` against the single reference time ``now``.
+    """
+    if not repositories:
+        return [], []
+
+    frame = scoring_frame(repositories)
+    days = days_since_push(frame['pushed_at'], now).to_numpy(dtype=float)
+    known = ~np.isnan(days)
+
+    score = np.full(len(frame), 50, dtype=np.int64)
+
+    # Community engagement (0-20 points)
+    score += np.minimum(frame['stars'].to_numpy() * 3, 20)
+
+    # Recent activity (0-15 points)
+    score += np.select(
+        [known & (days < 30), known & (days < 90), known & (days < 365)],
+        [15, 10, 5],
+        default=0
+    )
+
+    # Documentation quality (0-15 points)
+    score += np.where(frame['has_readme'], 5, 0)
+    description_length = frame['description_length'].to_numpy()
+    score += np.select([description_length > 50, description_length > 20], [10, 5], default=0)
+
+    # Technical implementation (0-10 points)
+    score += np.where(frame['has_language'], 5, 0) + np.where(frame['has_topics'], 5, 0)
+
+    # Repository size and activity (0-10 points)
+    size = frame['size'].to_numpy()
+    score += np.select([size > 1000, size > 100], [10, 5], default=0)
+
+    # License and open source practices (0-5 points)
+    score += np.where(frame['has_license'], 5, 0)
+
+    score = np.clip(score, 30, 100)
+
+    featured = (
+        (score >= 80)
+        | ((score >= 70) & (frame['stars'].to_numpy() > 0))
+        | ((score >= 65) & known & (days < 60))
+    )
+
+    return score.tolist(), featured.tolist()
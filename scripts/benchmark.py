@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Benchmark
+Runs the data update scripts against the fake GitHub API and records wall time, requests and peak RSS
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from fake_github_api import start_server
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+DEFAULT_RESULTS_FILE = os.path.join(REPO_ROOT, 'benchmarks', 'results.jsonl')
+
+# Scenario name -> script and arguments; scenarios run in this order in one working directory,
+# so the warm run sees the HTTP cache and README probe cache left by the cold run
+SCENARIOS = {
+    'update_repositories_cold': ['update_repositories.py'],
+    'update_repositories_warm': ['update_repositories.py'],
+    'private_repo_and_user_count': ['private_repo_and_user_count.py'],
+    'repo_reuse_metrics': ['repo_reuse_metrics.py'],
+    'update_repositories_throttled': ['update_repositories.py', '--no-cache'],
+    'repo_reuse_metrics_outage': ['repo_reuse_metrics.py']
+}
+
+# Fake API failure modes switched on for a scenario (see FakeGitHubServer.configure): the throttled
+# run spends a small quota window and gets secondary limits with Retry-After, so the rate limit
+# governor has to wait; the outage run fails one organization with 502s until its circuit opens
+SCENARIO_SERVER_OPTIONS = {
+    'update_repositories_throttled': {'rate_limit': 150, 'rate_limit_window': 5, 'throttle_every': 25},
+    'repo_reuse_metrics_outage': {'failing_orgs': ['Public-Health-Wales']}
+}
+
+def git_revision(tree: str = REPO_ROOT) -> Dict[str, Any]:
+    """Commit checked out in ``tree`` and whether it has uncommitted changes."""
+    def git(*args) -> str:
+        result = subprocess.run(['git', *args], cwd=tree, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ''
+    return {'commit': git('rev-parse', '--short', 'HEAD') or None,
+            'subject': git('log', '-1', '--format=%s') or None,
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+def run_scenario(name: str, command: List[str], workdir: str, env: Dict[str, str], server,
+                 scripts_dir: str = SCRIPTS_DIR) -> Dict[str, Any]:
+    """Run one script from ``scripts_dir`` to completion and measure it."""
+    before = server.snapshot()
+    log_path = os.path.join(workdir, f'{name}.log')
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(scripts_dir, command[0]), *command[1:]],
+                                   cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives the child's own resource usage, so peak RSS is per scenario
+        _, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    after = server.snapshot()
+
+    endpoints = {
+        endpoint: after['endpoints'][endpoint] - before['endpoints'].get(endpoint, 0)
+        for endpoint in sorted(after['endpoints'])
+        if after['endpoints'][endpoint] != before['endpoints'].get(endpoint, 0)
+    }
+    def status_count(*statuses: str) -> int:
+        return sum(after['statuses'].get(status, 0) - before['statuses'].get(status, 0) for status in statuses)
+
+    result = {
+        'exit_code': process.returncode,
+        'wall_time_s': round(wall_time, 3),
+        'cpu_time_s': round(usage.ru_utime + usage.ru_stime, 3),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'requests': after['total'] - before['total'],
+        'not_modified': status_count('304'),
+        'rate_limited': status_count('403', '429'),
+        'server_errors': status_count(*(status for status in after['statuses'] if status.startswith('5'))),
+        'endpoints': endpoints
+    }
+    if process.returncode != 0:
+        logger.error(f"{name} exited with {process.returncode}; see {log_path}")
+    return result
+
+def run_benchmark(config: Dict[str, Any], scenarios: List[str], keep: bool = False,
+                  tree: str = REPO_ROOT) -> Dict[str, Any]:
+    """Start the fake API, run the selected scenarios with the scripts in ``tree`` and return one results entry."""
+    server = start_server(seed=config['seed'], repos_per_org=config['repos_per_org'],
+                          latency=config['latency_ms'] / 1000)
+    workdir = tempfile.mkdtemp(prefix='solutions-exchange-bench-')
+    os.makedirs(os.path.join(workdir, 'data'))
+    env = {
+        **os.environ,
+        'solutions_exchange_secret': 'benchmark-token',
+        'GITHUB_API_URL': server.url,
+        'SOLUTIONS_EXCHANGE_CACHE_DIR': os.path.join(workdir, '.cache', 'github'),
+        'SOLUTIONS_EXCHANGE_SNAPSHOT_DB': os.path.join(workdir, 'data', 'snapshots.sqlite'),
+        'SOLUTIONS_EXCHANGE_TRAFFIC_DB': os.path.join(workdir, 'data', 'traffic.sqlite'),
+        'PYTHONHASHSEED': '0'
+    }
+    env.pop('GITHUB_STEP_SUMMARY', None)
+
+    results = {}
+    try:
+        for name in scenarios:
+            logger.info(f"Running {name}...")
+            server.configure(**SCENARIO_SERVER_OPTIONS.get(name, {}))
+            results[name] = run_scenario(name, SCENARIOS[name], workdir, env, server,
+                                         scripts_dir=os.path.join(tree, 'scripts'))
+            logger.info(f"  {results[name]['wall_time_s']}s, {results[name]['requests']} requests, "
+                        f"{results[name]['peak_rss_mb']} MB peak RSS")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if keep:
+            logger.info(f"Kept working directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'git': git_revision(tree),
+        'python': sys.version.split()[0],
+        'config': config,
+        'results': results
+    }
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """All recorded benchmark entries, oldest first."""
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return entries
+
+def previous_entry(entries: List[Dict[str, Any]], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Most recent entry run with the same configuration, so the numbers are comparable."""
+    for entry in reversed(entries):
+        if entry.get('config') == config:
+            return entry
+    return None
+
+def print_comparison(entry: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+    """Print this run's numbers beside the previous comparable run's."""
+    baseline = previous['results'] if previous else {}
+    label = f"vs {previous['git']['commit']}" if previous else "(no previous run with this config)"
+    print(f"\n{'Scenario':<30} {'Wall s':>8} {'Requests':>9} {'RSS MB':>8}   {label}")
+    for name, result in entry['results'].items():
+        line = f"{name:<30} {result['wall_time_s']:>8.2f} {result['requests']:>9} {result['peak_rss_mb']:>8.1f}"
+        before = baseline.get(name)
+        if before:
+            def change(key: str) -> str:
+                if not before[key]:
+                    return 'n/a'
+                return f"{(result[key] - before[key]) / before[key] * 100:+.0f}%"
+            line += (f"   wall {change('wall_time_s')}, requests {result['requests'] - before['requests']:+d}, "
+                     f"rss {change('peak_rss_mb')}")
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data update scripts offline")
+    parser.add_argument('--repos-per-org', type=int, default=40,
+                        help="Synthetic repositories generated for each organization")
+    parser.add_argument('--latency-ms', type=float, default=20,
+                        help="Delay the fake API adds to every response")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help="Run only these scenarios (repeatable; default all)")
+    parser.add_argument('--results-file', default=DEFAULT_RESULTS_FILE,
+                        help="JSON Lines file the results are appended to")
+    parser.add_argument('--no-save', action='store_true', help="Print results without recording them")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary working directory")
+    parser.add_argument('--tree', default=REPO_ROOT,
+                        help="Checkout whose scripts are run, e.g. a git worktree of an older commit "
+                             "(default: this one)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = {'repos_per_org': args.repos_per_org, 'latency_ms': args.latency_ms, 'seed': args.seed,
+              'scenarios': args.scenario or list(SCENARIOS)}
+
+    entry = run_benchmark(config, config['scenarios'], keep=args.keep, tree=os.path.abspath(args.tree))
+    print_comparison(entry, previous_entry(load_results(args.results_file), config))
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.results_file), exist_ok=True)
+        with open(args.results_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, sort_keys=True) + '\n')
+        logger.info(f"Appended results to {args.results_file}")
+
+    failed = [name for name, result in entry['results'].items() if result['exit_code'] != 0]
+    if failed:
+        logger.error(f"Failed scenarios: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Fake GitHub API
+Local stand-in for the GitHub REST endpoints used by the pipeline, for offline benchmarks
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Fixed clock so synthetic data (and therefore pipeline output) is the same on every run
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+LANGUAGES = ['Python', 'JavaScript', 'TypeScript', 'C#', 'R', 'HTML', 'Shell', 'Java', None]
+WORDS = ['clinical', 'patient', 'dashboard', 'forecast', 'data', 'pipeline', 'integration', 'pharmacy',
+         'mental', 'health', 'reporting', 'emergency', 'api', 'analytics', 'dental', 'mobile', 'security']
+TOPICS = ['nhs', 'wales', 'python', 'dashboard', 'analytics', 'fhir', 'r', 'api', 'data-science']
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class FakeGitHubData:
+    """Synthetic organizations and repositories, generated deterministically from a seed.
+
+    Any organization name is accepted and gets ``repos_per_org`` repositories,
+    so the organization lists hard-coded in the scripts work unchanged.
+    """
+
+    def __init__(self, seed: int = 1, repos_per_org: int = 40, private_ratio: float = 0.6):
+        self.seed = seed
+        self.repos_per_org = repos_per_org
+        self.private_ratio = private_ratio
+        self._orgs: Dict[str, List[Dict[str, Any]]] = {}
+        self._repos: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def organization(self, org: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            if org not in self._orgs:
+                self._orgs[org] = self._generate(org)
+                for repo in self._orgs[org]:
+                    self._repos[(org.lower(), repo['name'].lower())] = repo
+            return self._orgs[org]
+
+    def repository(self, owner: str, name: str) -> Optional[Dict[str, Any]]:
+        self.organization(owner)
+        return self._repos.get((owner.lower(), name.lower()))
+
+    def _generate(self, org: str) -> List[Dict[str, Any]]:
+        rng = random.Random(f'{self.seed}:{org}')
+        org_id = int(hashlib.sha256(org.encode('utf-8')).hexdigest()[:6], 16)
+        repos = []
+        for index in range(self.repos_per_org):
+            words = rng.sample(WORDS, 3)
+            name = f"{'-'.join(words[:2])}-{index}"
+            private = rng.random() < self.private_ratio
+            created = EPOCH - timedelta(days=rng.randint(30, 2000))
+            pushed = EPOCH - timedelta(days=rng.randint(0, 700), seconds=rng.randint(0, 86400))
+            repo_id = org_id * 10000 + index
+            empty = rng.random() < 0.05
+            repos.append({
+                'id': repo_id,
+                'node_id': f'R_{repo_id}',
+                'name': name,
+                'full_name': f'{org}/{name}',
+                'private': private,
+                'owner': {'login': org, 'id': org_id, 'html_url': f'https://github.com/{org}', 'type': 'Organization'},
+                'html_url': f'https://github.com/{org}/{name}',
+                'description': f"{' '.join(words).capitalize()} tool for NHS Wales teams" if rng.random() < 0.8 else None,
+                'fork': False,
+                'created_at': _timestamp(created),
+                'updated_at': _timestamp(max(pushed, created)),
+                'pushed_at': None if empty else _timestamp(max(pushed, created)),
+                'homepage': None,
+                'size': 0 if empty else rng.choice([12, 150, 800, 2500, 12000]),
+                'stargazers_count': rng.choice([0, 0, 0, 1, 2, 5]),
+                'watchers_count': 0,
+                'language': rng.choice(LANGUAGES),
+                'forks_count': rng.choice([0, 0, 1, 3]),
+                'archived': rng.random() < 0.05,
+                'disabled': False,
+                'open_issues_count': rng.randint(0, 10),
+                'license': {'key': 'mit', 'name': 'MIT License', 'spdx_id': 'MIT'} if rng.random() < 0.5 else None,
+                'topics': sorted(rng.sample(TOPICS, rng.randint(0, 4))),
+                'visibility': 'internal' if private else 'public',
+                'permissions': {'admin': True, 'maintain': True, 'push': True, 'triage': True, 'pull': True},
+                '_has_readme': not empty and rng.random() < 0.8,
+                '_releases': 0 if empty else rng.choice([0, 0, 1, 3, 120])
+            })
+        return repos
+
+def public(repo: Dict[str, Any]) -> Dict[str, Any]:
+    """Repository as returned by the API (without the generator's private fields)."""
+    return {key: value for key, value in repo.items() if not key.startswith('_')}
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """Threaded HTTP server that counts requests per endpoint.
+
+    Failure modes can be switched on to exercise the client's rate-limit and
+    circuit-breaker paths: ``rate_limit`` requests are allowed per
+    ``rate_limit_window`` seconds (403 with ``X-RateLimit-Remaining: 0``
+    once spent), every ``throttle_every``-th request gets a secondary rate
+    limit (alternately 403 and 429 with ``Retry-After: retry_after``), and
+    every request for a repository or organization in ``failing_orgs``
+    gets a 502.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], data: FakeGitHubData, latency: float = 0.0,
+                 rate_limit: int = 1_000_000, rate_limit_window: int = 3600, throttle_every: int = 0,
+                 retry_after: int = 1, failing_orgs: Iterable[str] = ()):
+        super().__init__(address, FakeGitHubHandler)
+        self.data = data
+        self.latency = latency
+        self.counts: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.configure(rate_limit=rate_limit, rate_limit_window=rate_limit_window,
+                       throttle_every=throttle_every, retry_after=retry_after, failing_orgs=failing_orgs)
+
+    def configure(self, rate_limit: int = 1_000_000, rate_limit_window: int = 3600, throttle_every: int = 0,
+                  retry_after: int = 1, failing_orgs: Iterable[str] = ()) -> None:
+        """Set the failure modes (defaults switch them off) and start a fresh rate-limit window."""
+        with self.lock:
+            self.rate_limit = rate_limit
+            self.rate_limit_window = rate_limit_window
+            self.throttle_every = throttle_every
+            self.retry_after = retry_after
+            self.failing_orgs = {org.lower() for org in failing_orgs}
+            self.remaining = rate_limit
+            self.reset_at = int(time.time()) + rate_limit_window
+
+    def failure(self, path: str) -> Optional[Tuple[int, Any, Dict[str, str]]]:
+        """Response for a request that hits one of the configured failure modes, else None."""
+        with self.lock:
+            self.requests += 1
+            if time.time() >= self.reset_at:
+                self.remaining = self.rate_limit
+                self.reset_at = int(time.time()) + self.rate_limit_window
+
+            parts = [part for part in path.split('/') if part]
+            if len(parts) >= 2 and parts[0] in ('orgs', 'repos') and parts[1].lower() in self.failing_orgs:
+                return 502, {'message': 'Server Error'}, {}
+            if self.remaining == 0:
+                return 403, {'message': 'API rate limit exceeded'}, {}
+            if self.throttle_every and self.requests % self.throttle_every == 0:
+                status = 429 if self.requests // self.throttle_every % 2 == 0 else 403
+                return (status, {'message': 'You have exceeded a secondary rate limit.'},
+                        {'Retry-After': str(self.retry_after)})
+        return None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Request counts so far, by endpoint and by status."""
+        with self.lock:
+            return {'total': sum(self.counts.values()), 'endpoints': dict(self.counts),
+                    'statuses': {str(status): count for status, count in self.statuses.items()}}
+
+ROUTES = [
+    ('org_repos', re.compile(r'^/orgs/([^/]+)/repos$')),
+    ('readme', re.compile(r'^/repos/([^/]+)/([^/]+)/readme$')),
+    ('traffic', re.compile(r'^/repos/([^/]+)/([^/]+)/traffic/(clones|views)$')),
+    ('releases', re.compile(r'^/repos/([^/]+)/([^/]+)/releases$')),
+    ('repo', re.compile(r'^/repos/([^/]+)/([^/]+)$')),
+    ('rate_limit', re.compile(r'^/rate_limit$'))
+]
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server: FakeGitHubServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        for endpoint, pattern in ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                failure = self.server.failure(parsed.path)
+                if failure:
+                    self.respond(endpoint, *failure)
+                    return
+                handler = getattr(self, f'get_{endpoint}')
+                status, body, headers = handler(*match.groups(), query=query, path=parsed.path)
+                self.respond(endpoint, status, body, headers)
+                return
+        self.respond('unknown', 404, {'message': 'Not Found'})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.respond('graphql' if self.path == '/graphql' else 'unknown', 501,
+                     {'message': 'GraphQL is not supported by the fake API'})
+
+    def respond(self, endpoint: str, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        headers = dict(headers or {})
+        etag = f'"{hashlib.sha256(data).hexdigest()[:20]}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, data = 304, b''
+
+        server = self.server
+        with server.lock:
+            server.counts[endpoint] += 1
+            server.statuses[status] += 1
+            if status != 304:
+                server.remaining = max(server.remaining - 1, 0)
+            remaining = server.remaining
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('X-RateLimit-Limit', str(server.rate_limit))
+        self.send_header('X-RateLimit-Remaining', str(remaining))
+        self.send_header('X-RateLimit-Reset', str(server.reset_at))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, items: List[Any], query: Dict[str, str], path: str) -> Tuple[List[Any], Dict[str, str]]:
+        """Slice ``items`` by per_page/page and build the Link header."""
+        per_page = min(int(query.get('per_page', 30)), 100)
+        page = max(int(query.get('page', 1)), 1)
+        last = max((len(items) + per_page - 1) // per_page, 1)
+
+        def link(number: int) -> str:
+            return f'<{self.server.url}{path}?{urlencode({**query, "page": number})}>'
+
+        links = []
+        if page < last:
+            links += [f'{link(page + 1)}; rel="next"', f'{link(last)}; rel="last"']
+        if page > 1:
+            links += [f'{link(1)}; rel="first"', f'{link(page - 1)}; rel="prev"']
+        headers = {'Link': ', '.join(links)} if links else {}
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def get_org_repos(self, org, query, path):
+        repos = [public(repo) for repo in self.server.data.organization(org)]
+        if query.get('type') not in ('all', 'private', 'internal'):
+            repos = [repo for repo in repos if not repo['private']]
+        page, headers = self._page(repos, query, path)
+        return 200, page, headers
+
+    def get_repo(self, owner, name, query, path):
+        repo = self.server.data.repository(owner, name)
+        return (200, public(repo), {}) if repo else (404, {'message': 'Not Found'}, {})
+
+    def get_readme(self, owner, name, query, path):
+        repo = self.server.data.repository(owner, name)
+        if not repo or not repo['_has_readme']:
+            return 404, {'message': 'Not Found'}, {}
+        size = 200 + repo['id'] % 5000
+        return 200, {'name': 'README.md', 'path': 'README.md', 'size': size, 'encoding': 'base64',
+                     'content': ''}, {'Last-Modified': 'Thu, 01 Jan 2026 00:00:00 GMT'}
+
+    def get_traffic(self, owner, name, kind, query, path):
+        repo = self.server.data.repository(owner, name)
+        if not repo:
+            return 404, {'message': 'Not Found'}, {}
+        rng = random.Random(f"{repo['id']}:{kind}")
+        buckets = [{'timestamp': _timestamp(EPOCH - timedelta(days=day)), 'count': rng.randint(0, 20),
+                    'uniques': rng.randint(0, 5)} for day in range(13, -1, -1)]
+        return 200, {'count': sum(bucket['count'] for bucket in buckets),
+                     'uniques': sum(bucket['uniques'] for bucket in buckets), kind: buckets}, {}
+
+    def get_releases(self, owner, name, query, path):
+        repo = self.server.data.repository(owner, name)
+        if not repo:
+            return 404, {'message': 'Not Found'}, {}
+        releases = [{'id': index, 'tag_name': f'v{index}', 'assets': [{'download_count': index % 7}]}
+                    for index in range(repo['_releases'])]
+        page, headers = self._page(releases, query, path)
+        return 200, page, headers
+
+    def get_rate_limit(self, query, path):
+        server = self.server
+        core = {'limit': server.rate_limit, 'remaining': server.remaining, 'reset': server.reset_at}
+        return 200, {'resources': {'core': core}, 'rate': core}, {}
+
+def start_server(host: str = '127.0.0.1', port: int = 0, **options) -> FakeGitHubServer:
+    """Start the fake API in a background thread; ``port=0`` picks a free port."""
+    data = FakeGitHubData(**{key: options.pop(key) for key in ('seed', 'repos_per_org') if key in options})
+    server = FakeGitHubServer((host, port), data, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake GitHub REST API for offline runs")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repos-per-org', type=int, default=40)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    parser.add_argument('--rate-limit', type=int, default=1_000_000,
+                        help="Requests allowed per rate-limit window before a 403")
+    parser.add_argument('--rate-limit-window', type=int, default=3600, help="Rate-limit window in seconds")
+    parser.add_argument('--throttle-every', type=int, default=0,
+                        help="Answer every Nth request with a secondary rate limit (0: never)")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on secondary limits")
+    parser.add_argument('--failing-org', action='append', default=[],
+                        help="Answer every request for this organization with a 502 (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = start_server(port=args.port, seed=args.seed, repos_per_org=args.repos_per_org,
+                          latency=args.latency_ms / 1000, rate_limit=args.rate_limit,
+                          rate_limit_window=args.rate_limit_window, throttle_every=args.throttle_every,
+                          retry_after=args.retry_after, failing_orgs=args.failing_org)
+    logger.info(f"Fake GitHub API listening on {server.url} (export GITHUB_API_URL={server.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
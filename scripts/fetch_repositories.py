@@ -1,47 +1,81 @@
-<<<<<<< HEAD
-=======
-import requests
-import pandas as pd
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Repository Fetcher
+Fetches repositories with NLP-generated tags and featured eligibility.
+NLP (nltk/textblob) and pandas are only imported by the stages that use them.
+"""
+
+import argparse
 import json
+import logging
 import os
-import re
+import sys
 from datetime import datetime, timedelta
-from collections import Counter
-import nltk
-from textblob import TextBlob
+from functools import lru_cache
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+import requests
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+from github_client import GitHubClient, GITHUB_API_URL
+from http_cache import HTTPCache
+from pipeline_metrics import PipelineMetrics
+from profiling import add_profile_arguments, profiler_from_args
+from readme_probe import ReadmeProbe
+from tag_matcher import description_keyword_matcher
 
 try:
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('averaged_perceptron_tagger')
+    from dotenv import load_dotenv
+except ImportError:  # Optional: environment variables can be set directly
+    load_dotenv = None
 
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-
-from dotenv import load_dotenv
-
-load_dotenv()  # This loads variables from .env into environment
+if load_dotenv is not None:
+    load_dotenv()  # This loads variables from .env into environment
 # Replace this with your actual GitHub personal access token
 GITHUB_TOKEN = os.getenv('GH_SECRET')
 
-# Set up the headers with the token
-headers = {
-    'Authorization': f'token {GITHUB_TOKEN}',
-    'Accept': 'application/vnd.github.v3+json'
+# NLTK data is read from a pre-provisioned directory; nothing is downloaded at run time
+NLTK_DATA_DIR = os.getenv('NLTK_DATA', os.path.join('.cache', 'nltk_data'))
+
+# Resources needed by TextBlob noun phrase extraction (name -> nltk.data path)
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'brown': 'corpora/brown'
 }
 
+class NLPUnavailableError(RuntimeError):
+    """Raised when the NLP libraries or NLTK corpora are not installed."""
+
+@lru_cache(maxsize=None)
+def load_noun_phrase_extractor():
+    """Import textblob and check the NLTK corpora; returns the TextBlob class.
+    
+    Called on first use so metadata-only runs never import nltk or textblob.
+    """
+    try:
+        import nltk
+        from textblob import TextBlob
+    except ImportError as e:
+        raise NLPUnavailableError(
+            f"NLP tagging needs nltk and textblob ({e}). Install them or run with --no-nlp."
+        ) from e
+    
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    
+    missing = []
+    for name, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    if missing:
+        raise NLPUnavailableError(
+            f"NLTK data not found: {', '.join(missing)}. Provision it once with "
+            f"'python -m nltk.downloader -d {NLTK_DATA_DIR} {' '.join(missing)}' "
+            f"(or set NLTK_DATA to an existing directory), or run with --no-nlp."
+        )
+    return TextBlob
+
 # List of organizations for NHS Wales Solutions Exchange
 organizations = [
     "Analytics-Learning-Programme", 
@@ -57,7 +91,7 @@ organizations = [
     "Swansea-Bay-University-Health-Board"
 ]
 
-def get_repositories_for_org(organization):
+def get_repositories_for_org(client, organization):
     """Fetch all repositories for a given organization."""
     repos = []
     page = 1
@@ -66,16 +100,20 @@ def get_repositories_for_org(organization):
     
     while True:
         # Construct the API URL for the organization
-        api_url = f'https://api.github.com/orgs/{organization}/repos'
+        api_url = f'{GITHUB_API_URL}/orgs/{organization}/repos'
         
-        # Fetch the repositories for the current page
-        response = requests.get(api_url, headers=headers, params={
-            'per_page': 100, 
-            'page': page,
-            'type': 'all',  # Include all types of repositories
-            'sort': 'updated',
-            'direction': 'desc'
-        })
+        # Fetch the repositories for the current page; the client has already retried transient failures
+        try:
+            response = client.get(api_url, params={
+                'per_page': 100, 
+                'page': page,
+                'type': 'all',  # Include all types of repositories
+                'sort': 'updated',
+                'direction': 'desc'
+            })
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed for {organization} (page {page}): {e}")
+            break
         
         if response.status_code == 404:
             print(f"Organization {organization} not found or no access")
@@ -112,49 +150,11 @@ def get_repositories_for_org(organization):
     print(f"  Total repositories for {organization}: {len(repos)}")
     return repos
 
-def generate_tags_from_description(description, existing_topics=None):
-    """Generate tags from repository description using NLP."""
+def generate_tags_from_description(description, existing_topics=None, use_nlp=True):
+    """Generate tags from repository description using keywords and, if enabled, NLP."""
     if not description or description.strip() == "":
         return []
     
-    # Healthcare and NHS-specific keywords to prioritize
-    healthcare_keywords = {
-        'clinical', 'patient', 'hospital', 'medical', 'health', 'healthcare', 'nhs', 'emergency',
-        'diagnosis', 'treatment', 'nursing', 'doctor', 'physician', 'therapy', 'medication',
-        'surgery', 'radiology', 'pathology', 'laboratory', 'cardiology', 'oncology',
-        'mental health', 'primary care', 'secondary care', 'tertiary care', 'outpatient',
-        'inpatient', 'discharge', 'admission', 'referral', 'prescription', 'pharmacy',
-        'epidemiology', 'public health', 'preventive', 'screening', 'vaccination',
-        'electronic health record', 'ehr', 'clinical decision support', 'telemedicine',
-        'digital health', 'health informatics', 'medical imaging', 'genomics'
-    }
-    
-    # Technical keywords
-    technical_keywords = {
-        'analytics', 'machine learning', 'ai', 'artificial intelligence', 'data science',
-        'visualization', 'dashboard', 'reporting', 'forecast', 'prediction', 'model',
-        'algorithm', 'neural network', 'deep learning', 'nlp', 'natural language processing',
-        'api', 'database', 'sql', 'nosql', 'etl', 'pipeline', 'automation', 'deployment',
-        'docker', 'kubernetes', 'cloud', 'aws', 'azure', 'monitoring', 'logging',
-        'security', 'authentication', 'encryption', 'backup', 'disaster recovery'
-    }
-    
-    # Department/specialty keywords  
-    department_keywords = {
-        'emergency department', 'ed', 'accident and emergency', 'a&e', 'intensive care',
-        'icu', 'operating theatre', 'maternity', 'pediatrics', 'geriatrics', 'psychiatry',
-        'radiology', 'pathology', 'pharmacy', 'physiotherapy', 'occupational therapy',
-        'social services', 'district nursing', 'community care', 'mental health services',
-        'ambulance service', 'blood transfusion', 'laboratory services', 'imaging',
-        'surgical services', 'medical services', 'nursing services', 'allied health'
-    }
-    
-    # Combine all keyword sets
-    all_keywords = healthcare_keywords | technical_keywords | department_keywords
-    
-    # Clean and normalize description
-    description_lower = description.lower()
-    
     # Extract existing topics to avoid duplication
     existing_topics = existing_topics or []
     existing_lower = [topic.lower() for topic in existing_topics]
@@ -162,17 +162,20 @@ def generate_tags_from_description(description, existing_topics=None):
     # Find matching keywords
     found_tags = []
     
-    # Direct keyword matching
-    for keyword in all_keywords:
-        if keyword in description_lower and keyword not in existing_lower:
+    # Healthcare, technical and department keywords (tag_rules.json), matched as whole words in one pass
+    for keyword in description_keyword_matcher().find(description):
+        if keyword not in existing_lower:
             # Capitalize properly
             tag = ' '.join(word.capitalize() for word in keyword.split())
             if tag not in found_tags and len(tag) > 2:
                 found_tags.append(tag)
     
+    if not use_nlp:
+        return found_tags[:5]
+    
     # Use TextBlob for noun phrase extraction
     try:
-        blob = TextBlob(description)
+        blob = load_noun_phrase_extractor()(description)
         noun_phrases = blob.noun_phrases
         
         for phrase in noun_phrases:
@@ -191,29 +194,16 @@ def generate_tags_from_description(description, existing_topics=None):
                 if len(found_tags) >= 5:  # Limit to 5 generated tags
                     break
                     
+    except NLPUnavailableError:
+        raise
     except Exception as e:
         print(f"Warning: Error in NLP processing: {e}")
     
     # Return up to 5 most relevant tags
     return found_tags[:5]
 
-def check_readme_exists(owner_login, repo_name, headers):
-    """Check if repository has a README file."""
-    readme_urls = [
-        f'https://api.github.com/repos/{owner_login}/{repo_name}/readme',
-        f'https://api.github.com/repos/{owner_login}/{repo_name}/contents/README.md',
-        f'https://api.github.com/repos/{owner_login}/{repo_name}/contents/readme.md',
-        f'https://api.github.com/repos/{owner_login}/{repo_name}/contents/README.txt'
-    ]
-    
-    for url in readme_urls:
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                return True
-        except:
-            continue
-    return False
+# Checklist items scored by calculate_featured_score
+FEATURE_CRITERIA = ['name', 'owner', 'language', 'description', 'tags', 'readme', 'recent_activity', 'license']
 
 def calculate_featured_score(repo, readme_exists=False):
     """Calculate a score for featuring eligibility based on the checklist."""
@@ -258,7 +248,7 @@ def calculate_featured_score(repo, readme_exists=False):
             if updated_date > six_months_ago:
                 score += 15
                 criteria_met['recent_activity'] = True
-        except:
+        except (ValueError, TypeError):
             pass
     
     # License (5 points bonus)
@@ -279,17 +269,25 @@ def determine_featured_eligibility(repo, readme_exists=False):
     
     eligible = score >= 80 and has_required
     
-def clean_repository_data(repo, headers):
+    return {
+        'eligible': eligible,
+        'score': score,
+        'missing_criteria': [criterion for criterion in FEATURE_CRITERIA if not criteria_met.get(criterion)]
+    }
+
+def clean_repository_data(repo, readme_probe, use_nlp=True):
     """Clean and standardize repository data with enhanced features."""
     
     # Generate tags from description
     generated_tags = generate_tags_from_description(
         repo.get('description', ''), 
-        repo.get('topics', [])
+        repo.get('topics', []),
+        use_nlp=use_nlp
     )
     
-    # Check for README
-    readme_exists = check_readme_exists(repo['owner']['login'], repo['name'], headers)
+    # README fields, normally added to the whole batch by readme_probe.apply
+    readme = repo if 'has_readme' in repo else readme_probe.probe(repo)
+    readme_exists = bool(readme['has_readme'])
     
     # Create enhanced repository data
     cleaned_repo = {
@@ -316,6 +314,8 @@ def clean_repository_data(repo, headers):
         'private': repo['private'],
         'license': repo.get('license'),
         'has_readme': readme_exists,  # New: README check
+        'readme_size': readme['readme_size'],
+        'readme_last_modified': readme['readme_last_modified'],
         'owner': {
             'login': repo['owner']['login'],
             'id': repo['owner']['id'],
@@ -329,43 +329,45 @@ def clean_repository_data(repo, headers):
     cleaned_repo['featured'] = feature_assessment
     
     return cleaned_repo
-    """Clean and standardize repository data."""
-    return {
-        'id': repo['id'],
-        'name': repo['name'],
-        'full_name': repo['full_name'],
-        'description': repo.get('description', ''),
-        'html_url': repo['html_url'],
-        'language': repo.get('language'),
-        'topics': repo.get('topics', []),
-        'visibility': repo['visibility'],
-        'created_at': repo['created_at'],
-        'updated_at': repo['updated_at'],
-        'pushed_at': repo.get('pushed_at'),
-        'size': repo['size'],
-        'stargazers_count': repo['stargazers_count'],
-        'watchers_count': repo['watchers_count'],
-        'forks_count': repo['forks_count'],
-        'open_issues_count': repo['open_issues_count'],
-        'archived': repo.get('archived', False),
-        'disabled': repo.get('disabled', False),
-        'private': repo['private'],
-        'owner': {
-            'login': repo['owner']['login'],
-            'id': repo['owner']['id'],
-            'html_url': repo['owner']['html_url'],
-            'type': repo['owner']['type']
-        }
-    }
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Fetch NHS Wales repositories with generated tags")
+    parser.add_argument('--no-nlp', action='store_true',
+                        help="Skip NLP noun phrase tags (keyword tags only; nltk/textblob are not loaded)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Bypass the on-disk HTTP and README caches and fetch everything in full")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to fetch all repositories and save to JSON."""
+    args = parse_args(argv)
+    use_nlp = not args.no_nlp
+    # The client, cache and README probe report through logging (cache hits, quota, retries)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     all_repositories = []
 
     # Check if GitHub token is available
     if not GITHUB_TOKEN:
         print("ERROR: GitHub token not found. Please set the GH_SECRET environment variable.")
         return
+    
+    # Fail before any API calls if NLP tagging was requested but cannot run
+    if use_nlp:
+        try:
+            load_noun_phrase_extractor()
+        except NLPUnavailableError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+    # Pooled, retrying client shared with the other fetch scripts; requests and stage times go to metrics.
+    # Built here rather than at import time because the client and probe read the cache directory
+    metrics = PipelineMetrics('fetch_repositories', profiler=profiler_from_args(args, 'fetch_repositories'))
+    client = GitHubClient(GITHUB_TOKEN, cache=HTTPCache(enabled=not args.no_cache), metrics=metrics)
+    
+    # One /readme request per repository, skipped when pushed_at is unchanged since the last run
+    readme_probe = ReadmeProbe(client, enabled=not args.no_cache)
 
     print("🔍 Initializing enhanced repository fetcher with AI tag generation...")
     print("📋 Feature criteria checklist:")
@@ -382,11 +384,15 @@ def main():
     # Loop over each organization and get their repositories
     for org in organizations:
         try:
-            repos = get_repositories_for_org(org)
+            with metrics.stage('fetch'):
+                repos = get_repositories_for_org(client, org)
             print(f"🤖 Generating AI tags for {len(repos)} repositories from {org}...")
             
-            # Clean the repository data with enhanced features
-            cleaned_repos = [clean_repository_data(repo, headers) for repo in repos]
+            # Look up READMEs concurrently, then clean the repository data with enhanced features
+            with metrics.stage('readme'):
+                readme_probe.apply(repos)
+            with metrics.stage('enhance'):
+                cleaned_repos = [clean_repository_data(repo, readme_probe, use_nlp) for repo in repos]
             all_repositories.extend(cleaned_repos)
             
             # Show feature eligibility stats for this org
@@ -397,33 +403,41 @@ def main():
             print(f"❌ Error processing organization {org}: {str(e)}")
             continue
 
+    readme_probe.log_stats()
+    readme_probe.save()
+    client.log_stats()
+    client.close()
+
     # Sort repositories by update date (most recent first)
     all_repositories.sort(key=lambda x: x['updated_at'], reverse=True)
 
     # Create output files
     try:
-        # Save as JSON for the web application
-        with open('data/repositories.json', 'w', encoding='utf-8') as f:
-            json.dump(all_repositories, f, indent=2, ensure_ascii=False)
+        with metrics.stage('save'):
+            # Save as JSON for the web application
+            with open('data/repositories.json', 'w', encoding='utf-8') as f:
+                json.dump(all_repositories, f, indent=2, ensure_ascii=False)
         
-        # Save as CSV for analysis (flattened for CSV compatibility)
-        csv_data = []
-        for repo in all_repositories:
-            csv_row = repo.copy()
-            csv_row['topics'] = '; '.join(repo['topics'])
-            csv_row['generated_tags'] = '; '.join(repo['generated_tags']) 
-            csv_row['all_tags'] = '; '.join(repo['all_tags'])
-            csv_row['featured_eligible'] = repo['featured']['eligible']
-            csv_row['featured_score'] = repo['featured']['score']
-            csv_row['missing_criteria'] = '; '.join(repo['featured']['missing_criteria'])
-            # Remove nested objects for CSV
-            del csv_row['owner']
-            del csv_row['featured']
-            del csv_row['license']
-            csv_data.append(csv_row)
+            # Save as CSV for analysis (flattened for CSV compatibility); pandas is only needed here
+            import pandas as pd
+        
+            csv_data = []
+            for repo in all_repositories:
+                csv_row = repo.copy()
+                csv_row['topics'] = '; '.join(repo['topics'])
+                csv_row['generated_tags'] = '; '.join(repo['generated_tags']) 
+                csv_row['all_tags'] = '; '.join(repo['all_tags'])
+                csv_row['featured_eligible'] = repo['featured']['eligible']
+                csv_row['featured_score'] = repo['featured']['score']
+                csv_row['missing_criteria'] = '; '.join(repo['featured']['missing_criteria'])
+                # Remove nested objects for CSV
+                del csv_row['owner']
+                del csv_row['featured']
+                del csv_row['license']
+                csv_data.append(csv_row)
             
-        df = pd.DataFrame(csv_data)
-        df.to_csv('data/repositories.csv', index=False)
+            df = pd.DataFrame(csv_data)
+            df.to_csv('data/repositories.csv', index=False)
         
         print(f"\n✅ Successfully processed {len(all_repositories)} repositories")
         print(f"📊 Data saved to 'data/repositories.json' and 'data/repositories.csv'")
@@ -470,6 +484,9 @@ def main():
     except Exception as e:
         print(f"❌ Error saving data: {str(e)}")
 
+    metrics.export(client)
+    if metrics.profiler:
+        metrics.profiler.write()
+
 if __name__ == "__main__":
     main()
->>>>>>> da3d0780438625098785d3b610a27b3e2ceb928b
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - GitHub API Client
+Shared, pooled and retrying HTTP client used by all GitHub-calling scripts
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HTTPCache
+from pipeline_metrics import PipelineMetrics
+from rate_limit import RateLimitGovernor
+
+logger = logging.getLogger(__name__)
+
+# Overridable for GitHub Enterprise (Actions sets it) or a local stand-in such as scripts/fake_github_api.py
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+DEFAULT_USER_AGENT = 'NHS-Wales-Solutions-Exchange/1.0'
+
+# (connect, read) timeout in seconds applied to every request
+DEFAULT_TIMEOUT: Tuple[float, float] = (10, 30)
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised when requests for a scope are short-circuited after repeated failures."""
+
+class CircuitBreaker:
+    """Per-scope circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail fast for ``reset_timeout`` seconds; the next request after
+    that is let through as a trial and closes the circuit again on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, scope: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(scope)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.reset_timeout:
+                # Half-open: allow a trial request through
+                del self._opened_at[scope]
+                self._failures[scope] = self.failure_threshold - 1
+                return True
+            return False
+
+    def record_success(self, scope: str) -> None:
+        with self._lock:
+            self._failures.pop(scope, None)
+            self._opened_at.pop(scope, None)
+
+    def record_failure(self, scope: str) -> None:
+        with self._lock:
+            failures = self._failures.get(scope, 0) + 1
+            self._failures[scope] = failures
+            if failures >= self.failure_threshold and scope not in self._opened_at:
+                self._opened_at[scope] = time.monotonic()
+                logger.warning(f"Circuit opened for {scope} after {failures} consecutive failures")
+
+class GitHubClient:
+    """Keep-alive GitHub REST client with retries, timeouts and circuit breaking.
+
+    All requests share one ``requests.Session`` whose connection pool is sized
+    by ``pool_size``. 5xx responses and connection errors are retried with
+    full-jitter exponential backoff, and a per-organization circuit breaker
+    stops one failing organization from stalling the whole crawl. Responses go
+    through the on-disk ``HTTPCache`` and are admitted by a shared
+    ``RateLimitGovernor``, which waits out primary and secondary rate limits
+    and retries instead of returning the 403/429 to the caller. Every attempt
+    and retry is recorded in ``metrics`` by endpoint class.
+    """
+
+    def __init__(self, token: str, user_agent: str = DEFAULT_USER_AGENT,
+                 pool_size: int = 10, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 max_retries: int = 3, max_rate_limit_waits: int = 5, backoff_base: float = 1.0, backoff_cap: float = 30,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 cache: Optional[HTTPCache] = None,
+                 governor: Optional[RateLimitGovernor] = None,
+                 metrics: Optional[PipelineMetrics] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_rate_limit_waits = max_rate_limit_waits
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.cache = cache or HTTPCache()
+        self.governor = governor or RateLimitGovernor(max_concurrency=pool_size)
+        self.metrics = metrics or PipelineMetrics()
+
+        self.headers = {
+            'Authorization': f'token {token}',
+            'Accept': 'application/vnd.github.v3+json',
+            'User-Agent': user_agent
+        }
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def scope_for(url: str) -> str:
+        """Derive the circuit-breaker scope (the owning organization) from a URL."""
+        parts = [part for part in urlparse(url).path.split('/') if part]
+        if len(parts) >= 2 and parts[0] in ('orgs', 'repos', 'users'):
+            return parts[1]
+        return urlparse(url).netloc
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET a GitHub API URL, retrying transient failures.
+
+        Returns the final response (which may still be a 5xx once retries are
+        exhausted); raises ``requests.exceptions.RequestException`` if the
+        connection keeps failing or the organization's circuit is open.
+        """
+        if url.startswith('/'):
+            url = GITHUB_API_URL + url
+        request_headers = {**self.headers, **(headers or {})}
+
+        return self._send(url, lambda: self.cache.get(url, headers=request_headers, params=params,
+                                                      timeout=self.timeout, session=self.session))
+
+    def post(self, url: str, json_body: Dict[str, Any], scope: Optional[str] = None) -> requests.Response:
+        """POST JSON to a GitHub API URL (uncached), retrying transient failures."""
+        if url.startswith('/'):
+            url = GITHUB_API_URL + url
+        return self._send(url, lambda: self.session.post(url, headers=self.headers, json=json_body,
+                                                         timeout=self.timeout), scope=scope)
+
+    def _send(self, url: str, send: Callable[[], requests.Response],
+              scope: Optional[str] = None) -> requests.Response:
+        """Run ``send`` under the governor, circuit breaker and retry policy."""
+        scope = scope or self.scope_for(url)
+
+        attempt = 0
+        rate_limit_waits = 0
+        while True:
+            if not self.circuit_breaker.allow(scope):
+                raise CircuitOpenError(f"Circuit open for {scope}; skipping {url}")
+
+            try:
+                with self.governor.slot():
+                    start = time.perf_counter()
+                    try:
+                        response = send()
+                    finally:
+                        elapsed = time.perf_counter() - start
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.record_request(url, 'error', elapsed)
+                self.circuit_breaker.record_failure(scope)
+                if attempt == self.max_retries:
+                    raise
+                self.metrics.record_retry(url, 'connection')
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"Request to {url} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            from_cache = getattr(response, 'from_cache', False)
+            self.metrics.record_request(url, 304 if from_cache else response.status_code, elapsed, from_cache)
+            self.governor.update(response)
+
+            # Rate limits are waited out and do not use up the retry budget
+            wait = self.governor.throttle(response)
+            if wait is not None and rate_limit_waits < self.max_rate_limit_waits:
+                self.metrics.record_retry(url, 'rate_limit')
+                time.sleep(wait)
+                rate_limit_waits += 1
+                continue
+
+            if response.status_code < 500:
+                self.circuit_breaker.record_success(scope)
+                return response
+
+            self.circuit_breaker.record_failure(scope)
+            if attempt == self.max_retries:
+                return response
+            self.metrics.record_retry(url, 'server_error')
+            delay = self.backoff_delay(attempt)
+            logger.warning(f"GitHub returned {response.status_code} for {url}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def log_stats(self) -> None:
+        """Log cache and rate limit counters at the end of a run."""
+        self.cache.log_stats()
+        stats = self.governor.stats()
+        logger.info(f"GitHub quota: {stats['quota_used']} requests used, {stats['remaining']} remaining, "
+                    f"{stats['throttle_events']} rate limit waits")
+
+    def close(self) -> None:
+        """Close pooled connections and persist the rate limit state."""
+        self.governor.save_state()
+        self.session.close()
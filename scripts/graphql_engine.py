@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - GraphQL Repository Engine
+Bulk repository listing and enrichment through the GitHub GraphQL API
+"""
+
+import logging
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import requests
+
+from github_client import GitHubClient, GITHUB_API_URL
+
+logger = logging.getLogger(__name__)
+
+GRAPHQL_URL = f'{GITHUB_API_URL}/graphql'
+
+# README file names probed in a single query (same names check_readme_exists looks for)
+README_EXPRESSIONS = {
+    'readmeMd': 'HEAD:README.md',
+    'readmeLower': 'HEAD:readme.md',
+    'readmeTxt': 'HEAD:README.txt',
+    'readmeRst': 'HEAD:README.rst',
+    'readmePlain': 'HEAD:README'
+}
+
+# The REST listing fields that have a GraphQL equivalent, plus README presence and release
+# downloads. has_pages, has_downloads, has_pull_requests, pull_request_creation_policy,
+# custom_properties, security_and_analysis and the owner's user_view_type have none and are
+# left out of GraphQL records.
+REPOSITORY_FIELDS = """
+fragment RepoFields on Repository {
+  databaseId
+  id
+  name
+  nameWithOwner
+  description
+  url
+  homepageUrl
+  isPrivate
+  isFork
+  isArchived
+  isDisabled
+  isTemplate
+  forkingAllowed
+  webCommitSignoffRequired
+  hasIssuesEnabled
+  hasProjectsEnabled
+  hasWikiEnabled
+  hasDiscussionsEnabled
+  mirrorUrl
+  defaultBranchRef { name }
+  viewerPermission
+  visibility
+  createdAt
+  updatedAt
+  pushedAt
+  diskUsage
+  stargazerCount
+  forkCount
+  issues(states: OPEN) { totalCount }
+  pullRequests(states: OPEN) { totalCount }
+  primaryLanguage { name }
+  licenseInfo { key name spdxId }
+  repositoryTopics(first: 20) { nodes { topic { name } } }
+  owner { __typename id login url avatarUrl ... on Organization { databaseId } ... on User { databaseId } }
+%s
+  releases(first: 20, orderBy: {field: CREATED_AT, direction: DESC}) {
+    pageInfo { hasNextPage }
+    nodes { releaseAssets(first: 50) { pageInfo { hasNextPage } nodes { downloadCount } } }
+  }
+}
+""" % '\n'.join(f'  {alias}: object(expression: "{expression}") {{ ... on Blob {{ byteSize }} }}'
+                for alias, expression in README_EXPRESSIONS.items())
+
+# REST hypermedia links, relative to the repository's API URL
+REPOSITORY_URL_TEMPLATES = {
+    'archive_url': '/{archive_format}{/ref}',
+    'assignees_url': '/assignees{/user}',
+    'blobs_url': '/git/blobs{/sha}',
+    'branches_url': '/branches{/branch}',
+    'collaborators_url': '/collaborators{/collaborator}',
+    'comments_url': '/comments{/number}',
+    'commits_url': '/commits{/sha}',
+    'compare_url': '/compare/{base}...{head}',
+    'contents_url': '/contents/{+path}',
+    'contributors_url': '/contributors',
+    'deployments_url': '/deployments',
+    'downloads_url': '/downloads',
+    'events_url': '/events',
+    'forks_url': '/forks',
+    'git_commits_url': '/git/commits{/sha}',
+    'git_refs_url': '/git/refs{/sha}',
+    'git_tags_url': '/git/tags{/sha}',
+    'hooks_url': '/hooks',
+    'issue_comment_url': '/issues/comments{/number}',
+    'issue_events_url': '/issues/events{/number}',
+    'issues_url': '/issues{/number}',
+    'keys_url': '/keys{/key_id}',
+    'labels_url': '/labels{/name}',
+    'languages_url': '/languages',
+    'merges_url': '/merges',
+    'milestones_url': '/milestones{/number}',
+    'notifications_url': '/notifications{?since,all,participating}',
+    'pulls_url': '/pulls{/number}',
+    'releases_url': '/releases{/id}',
+    'stargazers_url': '/stargazers',
+    'statuses_url': '/statuses/{sha}',
+    'subscribers_url': '/subscribers',
+    'subscription_url': '/subscription',
+    'tags_url': '/tags',
+    'teams_url': '/teams',
+    'trees_url': '/git/trees{/sha}'
+}
+
+# Owner hypermedia links, relative to the owner's API URL
+OWNER_URL_TEMPLATES = {
+    'followers_url': '/followers',
+    'following_url': '/following{/other_user}',
+    'gists_url': '/gists{/gist_id}',
+    'starred_url': '/starred{/owner}{/repo}',
+    'subscriptions_url': '/subscriptions',
+    'organizations_url': '/orgs',
+    'repos_url': '/repos',
+    'events_url': '/events{/privacy}',
+    'received_events_url': '/received_events'
+}
+
+# viewerPermission -> the REST ``permissions`` flags it grants
+PERMISSION_LEVELS = ['READ', 'TRIAGE', 'WRITE', 'MAINTAIN', 'ADMIN']
+PERMISSION_FLAGS = {'pull': 'READ', 'triage': 'TRIAGE', 'push': 'WRITE', 'maintain': 'MAINTAIN', 'admin': 'ADMIN'}
+
+class GraphQLError(requests.exceptions.RequestException):
+    """Raised when a GraphQL query fails as a whole."""
+
+def release_downloads(node: Dict[str, Any]) -> Optional[int]:
+    """Total asset downloads of a repository node's releases.
+
+    Returns None when the releases or any release's assets run past the page
+    fetched in the query, so callers count them with the paginated REST
+    endpoint instead of undercounting.
+    """
+    releases = node.get('releases') or {}
+    if (releases.get('pageInfo') or {}).get('hasNextPage'):
+        return None
+
+    downloads = 0
+    for release in releases.get('nodes', []):
+        assets = release.get('releaseAssets') or {}
+        if (assets.get('pageInfo') or {}).get('hasNextPage'):
+            return None
+        downloads += sum(asset.get('downloadCount', 0) for asset in assets.get('nodes', []))
+    return downloads
+
+def rest_permissions(viewer_permission: Optional[str]) -> Optional[Dict[str, bool]]:
+    """REST ``permissions`` flags for a GraphQL ``viewerPermission`` level."""
+    if viewer_permission not in PERMISSION_LEVELS:
+        return None
+    level = PERMISSION_LEVELS.index(viewer_permission)
+    return {flag: level >= PERMISSION_LEVELS.index(required) for flag, required in PERMISSION_FLAGS.items()}
+
+def to_rest_repository(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a GraphQL repository node to the REST listing shape.
+
+    ``downloads_count`` is None when the releases did not fit in the query
+    (see ``release_downloads``).
+    """
+    owner = node.get('owner') or {}
+    license_info = node.get('licenseInfo')
+    readme_sizes = [node[alias]['byteSize'] for alias in README_EXPRESSIONS if node.get(alias)]
+    api_url = f"{GITHUB_API_URL}/repos/{node['nameWithOwner']}"
+    owner_api_url = f"{GITHUB_API_URL}/users/{owner.get('login')}"
+
+    return {
+        'id': node['databaseId'],
+        'node_id': node['id'],
+        'name': node['name'],
+        'full_name': node['nameWithOwner'],
+        'private': node['isPrivate'],
+        'owner': {
+            'login': owner.get('login'),
+            'id': owner.get('databaseId'),
+            'node_id': owner.get('id'),
+            'avatar_url': owner.get('avatarUrl'),
+            'gravatar_id': '',
+            'url': owner_api_url,
+            'html_url': owner.get('url'),
+            **{field: owner_api_url + suffix for field, suffix in OWNER_URL_TEMPLATES.items()},
+            'type': owner.get('__typename'),
+            'site_admin': False
+        },
+        'html_url': node['url'],
+        'url': api_url,
+        **{field: api_url + suffix for field, suffix in REPOSITORY_URL_TEMPLATES.items()},
+        'git_url': f"git://github.com/{node['nameWithOwner']}.git",
+        'ssh_url': f"git@github.com:{node['nameWithOwner']}.git",
+        'clone_url': f"{node['url']}.git",
+        'svn_url': node['url'],
+        'mirror_url': node.get('mirrorUrl'),
+        'description': node.get('description'),
+        'fork': node['isFork'],
+        'created_at': node['createdAt'],
+        'updated_at': node['updatedAt'],
+        'pushed_at': node.get('pushedAt'),
+        'homepage': node.get('homepageUrl'),
+        'size': node.get('diskUsage') or 0,
+        'stargazers_count': node['stargazerCount'],
+        'watchers_count': node['stargazerCount'],  # REST reports stargazers as watchers_count
+        'watchers': node['stargazerCount'],
+        'language': (node.get('primaryLanguage') or {}).get('name'),
+        'forks_count': node['forkCount'],
+        'forks': node['forkCount'],
+        'archived': node['isArchived'],
+        'disabled': node['isDisabled'],
+        'is_template': node.get('isTemplate', False),
+        'allow_forking': node.get('forkingAllowed', True),
+        'web_commit_signoff_required': node.get('webCommitSignoffRequired', False),
+        'has_issues': node.get('hasIssuesEnabled', True),
+        'has_projects': node.get('hasProjectsEnabled', True),
+        'has_wiki': node.get('hasWikiEnabled', True),
+        'has_discussions': node.get('hasDiscussionsEnabled', False),
+        'default_branch': (node.get('defaultBranchRef') or {}).get('name'),
+        'open_issues_count': node['issues']['totalCount'] + node['pullRequests']['totalCount'],
+        'open_issues': node['issues']['totalCount'] + node['pullRequests']['totalCount'],
+        'license': {
+            'key': license_info.get('key'),
+            'name': license_info.get('name'),
+            'spdx_id': license_info.get('spdxId')
+        } if license_info else None,
+        'topics': [topic['topic']['name'] for topic in node['repositoryTopics']['nodes']],
+        'visibility': node['visibility'].lower(),
+        'permissions': rest_permissions(node.get('viewerPermission')),
+        'has_readme': bool(readme_sizes),
+        'readme_size': readme_sizes[0] if readme_sizes else None,
+        'downloads_count': release_downloads(node)
+    }
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class GitHubGraphQLEngine:
+    """Lists and enriches repositories with batched, aliased GraphQL queries.
+
+    Several organizations are listed per query (one alias each) and each
+    alias carries its own pagination cursor, so a full refresh takes a few
+    requests instead of one REST call per page plus several per repository.
+    """
+
+    def __init__(self, client: GitHubClient, orgs_per_query: int = 4,
+                 repos_per_page: int = 50, repos_per_query: int = 40):
+        self.client = client
+        self.orgs_per_query = orgs_per_query
+        self.repos_per_page = repos_per_page
+        self.repos_per_query = repos_per_query
+        self.queries = 0
+
+    def query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a GraphQL query and return its ``data``; partial errors are logged."""
+        response = self.client.post(GRAPHQL_URL, {'query': query, 'variables': variables}, scope='graphql')
+        self.queries += 1
+        if response.status_code != 200:
+            raise GraphQLError(f"GraphQL request failed: {response.status_code}, {response.text}")
+
+        payload = response.json()
+        for error in payload.get('errors', []):
+            # NOT_FOUND for an inaccessible organization still returns the other aliases
+            logger.warning(f"GraphQL error: {error.get('message')}")
+        if payload.get('data') is None:
+            raise GraphQLError("GraphQL query returned no data")
+        return payload['data']
+
+    def fetch_organizations(self, organizations: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """List every repository of each organization, returned in REST shape."""
+        results: Dict[str, List[Dict[str, Any]]] = {org: [] for org in organizations}
+        cursors: Dict[str, Optional[str]] = {org: None for org in organizations}
+
+        while cursors:
+            pending = list(cursors)
+            for batch in _chunks(pending, self.orgs_per_query):
+                definitions = []
+                selections = []
+                variables: Dict[str, Any] = {'first': self.repos_per_page}
+                for index, org in enumerate(batch):
+                    definitions.append(f'$login{index}: String!, $after{index}: String')
+                    selections.append(
+                        f'o{index}: organization(login: $login{index}) {{ '
+                        f'repositories(first: $first, after: $after{index}, orderBy: {{field: NAME, direction: ASC}}) {{ '
+                        f'pageInfo {{ hasNextPage endCursor }} nodes {{ ...RepoFields }} }} }}'
+                    )
+                    variables[f'login{index}'] = org
+                    variables[f'after{index}'] = cursors[org]
+
+                query = (f"query({', '.join(definitions)}, $first: Int!) {{\n"
+                         + '\n'.join(selections) + '\n}\n' + REPOSITORY_FIELDS)
+                data = self.query(query, variables)
+
+                for index, org in enumerate(batch):
+                    organization = data.get(f'o{index}')
+                    if organization is None:
+                        logger.warning(f"Organization {org} not found or not accessible")
+                        del cursors[org]
+                        continue
+
+                    connection = organization['repositories']
+                    results[org].extend(to_rest_repository(node) for node in connection['nodes'] if node)
+                    page_info = connection['pageInfo']
+                    if page_info['hasNextPage']:
+                        cursors[org] = page_info['endCursor']
+                    else:
+                        del cursors[org]
+
+        logger.info(f"GraphQL listed {sum(len(repos) for repos in results.values())} repositories "
+                    f"from {len(organizations)} organizations in {self.queries} queries")
+        return results
+
+    def fetch_repositories(self, names: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """Fetch specific ``(owner, name)`` repositories, keyed by full name."""
+        results: Dict[str, Dict[str, Any]] = {}
+
+        for batch in _chunks(names, self.repos_per_query):
+            definitions = []
+            selections = []
+            variables: Dict[str, Any] = {}
+            for index, (owner, name) in enumerate(batch):
+                definitions.append(f'$owner{index}: String!, $name{index}: String!')
+                selections.append(f'r{index}: repository(owner: $owner{index}, name: $name{index}) {{ ...RepoFields }}')
+                variables[f'owner{index}'] = owner
+                variables[f'name{index}'] = name
+
+            query = f"query({', '.join(definitions)}) {{\n" + '\n'.join(selections) + '\n}\n' + REPOSITORY_FIELDS
+            data = self.query(query, variables)
+
+            for index, (owner, name) in enumerate(batch):
+                node = data.get(f'r{index}')
+                if node is None:
+                    logger.warning(f"Repository {owner}/{name} not found or not accessible")
+                    continue
+                results[f'{owner}/{name}'] = to_rest_repository(node)
+
+        return results
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - History Export
+Monthly JSON Lines files that keep the SQLite history stores durable in git
+"""
+
+import json
+import os
+import logging
+from typing import Dict, List, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+def month_of(day: str) -> str:
+    """Month (YYYY-MM) of an ISO day."""
+    return day[:7]
+
+def history_months(history_dir: str) -> List[str]:
+    """Months with an export file in ``history_dir``, oldest first."""
+    try:
+        names = os.listdir(history_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len('.jsonl')] for name in names if name.endswith('.jsonl'))
+
+def read_history(history_dir: str, month: str) -> Iterator[Dict[str, Any]]:
+    """Yield the day records of one month's export file."""
+    with open(os.path.join(history_dir, f'{month}.jsonl'), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def write_history(history_dir: str, month: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Replace one month's export file with ``records`` (one day per line); returns the lines written.
+
+    Days are written in order with stable formatting, so rewriting a month
+    only changes the lines of days whose data changed.
+    """
+    os.makedirs(history_dir, exist_ok=True)
+    path = os.path.join(history_dir, f'{month}.jsonl')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+                written += 1
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
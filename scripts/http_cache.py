@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - HTTP Response Cache
+Persistent ETag/Last-Modified cache shared by the GitHub-calling scripts
+"""
+
+import hashlib
+import json
+import os
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv('SOLUTIONS_EXCHANGE_CACHE_DIR', '.cache/github')
+
+# Response headers kept alongside the cached body (Link is needed for pagination)
+STORED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Link']
+
+class HTTPCache:
+    """On-disk cache of GET responses, revalidated with conditional requests.
+
+    Entries are keyed by the full request URL and the caller's auth scope (a
+    hash of the Authorization header), so different tokens never share
+    responses. A stored entry is revalidated with ``If-None-Match`` /
+    ``If-Modified-Since``; a ``304 Not Modified`` is answered from disk and
+    does not count against the GitHub rate limit.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        """Build the cache key for a fully-qualified URL and auth scope."""
+        auth = (headers or {}).get('Authorization', '')
+        scope = hashlib.sha256(auth.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{scope}\n{url}".encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _store_entry(self, key: str, response: requests.Response) -> None:
+        if not (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            return  # Nothing to revalidate with
+
+        entry = {
+            'url': response.url,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'body': response.content.decode('utf-8')
+        }
+
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Failed to write cache entry for {response.url}: {e}")
+
+    @staticmethod
+    def _response_from_entry(entry: Dict[str, Any], live: requests.Response) -> requests.Response:
+        """Rebuild a 200 response from a cached entry after a 304."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # Keep live rate-limit headers so callers see the current quota
+        for name, value in live.headers.items():
+            if name.lower().startswith('x-ratelimit'):
+                response.headers[name] = value
+        response.request = live.request
+        response.from_cache = True
+        return response
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            params: Optional[Dict[str, Any]] = None, timeout: float = 30,
+            session: Optional[requests.Session] = None) -> requests.Response:
+        """Perform a conditional GET, serving the body from disk on 304."""
+        sender = session or requests
+        if not self.enabled:
+            return sender.get(url, headers=headers, params=params, timeout=timeout)
+
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        key = self.cache_key(full_url, headers)
+        entry = self._load_entry(key)
+
+        request_headers = dict(headers or {})
+        if entry:
+            cached_headers = CaseInsensitiveDict(entry['headers'])
+            if cached_headers.get('ETag'):
+                request_headers['If-None-Match'] = cached_headers['ETag']
+            if cached_headers.get('Last-Modified'):
+                request_headers['If-Modified-Since'] = cached_headers['Last-Modified']
+
+        response = sender.get(full_url, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            with self._lock:
+                self.hits += 1
+            return self._response_from_entry(entry, response)
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self._store_entry(key, response)
+        response.from_cache = False
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this cache."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits / total) * 100, 1) if total > 0 else 0
+        }
+
+    def log_stats(self) -> None:
+        """Log hit/miss counters at the end of a run."""
+        if self.enabled:
+            stats = self.stats()
+            logger.info(f"HTTP cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']}% served from cache)")
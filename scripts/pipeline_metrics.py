@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Pipeline Metrics
+Per-endpoint request and per-stage timing instrumentation for the GitHub-calling scripts
+"""
+
+import json
+import os
+import re
+import sys
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, Union
+from urllib.parse import urlparse
+
+from profiling import StageProfiler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_FILE = 'data/pipeline_metrics.json'
+DEFAULT_PROMETHEUS_FILE = 'data/pipeline_metrics.prom'
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Path patterns -> endpoint class; owner, repository and organization names are dropped
+ENDPOINT_CLASSES = [
+    (re.compile(r'^/orgs/[^/]+/repos$'), 'orgs/repos'),
+    (re.compile(r'^/orgs/[^/]+$'), 'orgs'),
+    (re.compile(r'^/repos/[^/]+/[^/]+$'), 'repos'),
+    (re.compile(r'^/repos/[^/]+/[^/]+/contents/.*$'), 'repos/contents'),
+    (re.compile(r'^/repos/[^/]+/[^/]+/traffic/([^/]+)$'), 'repos/traffic/{0}'),
+    (re.compile(r'^/repos/[^/]+/[^/]+/([^/]+)$'), 'repos/{0}'),
+    (re.compile(r'^/(graphql|rate_limit)$'), '{0}')
+]
+
+def endpoint_class(url: str) -> str:
+    """Endpoint class of a GitHub API URL, e.g. ``repos/readme`` for any repository's README."""
+    path = urlparse(url).path.rstrip('/')
+    if path.startswith('/api/v3/'):
+        # GitHub Enterprise Server prefixes REST paths
+        path = path[len('/api/v3'):]
+    for pattern, name in ENDPOINT_CLASSES:
+        match = pattern.match(path)
+        if match:
+            return name.format(*match.groups())
+    return 'other'
+
+def default_script_name() -> str:
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+class PipelineMetrics:
+    """Thread-safe counters for one script run.
+
+    ``GitHubClient`` records every request attempt (endpoint class, status,
+    latency, whether it was answered from the HTTP cache) and every retry;
+    scripts time their stages with ``stage()``. Stage time is summed over all
+    threads that ran the stage, so with a worker pool it can exceed the wall
+    time of the run. Stages are also profiled when a ``profiler`` is given.
+    """
+
+    def __init__(self, script: Optional[str] = None, profiler: Optional[StageProfiler] = None):
+        self.script = script or default_script_name()
+        self.profiler = profiler
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, name: str) -> Dict[str, Any]:
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            endpoint = self._endpoints[name] = {
+                'requests': 0, 'cache_hits': 0, 'statuses': {}, 'retries': {},
+                'latency_sum': 0.0, 'latency_max': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)
+            }
+        return endpoint
+
+    def record_request(self, url: str, status: Union[int, str], seconds: float, from_cache: bool = False) -> None:
+        """Count one request attempt; ``status`` is the HTTP status or ``'error'`` for a failed connection."""
+        bucket = next((index for index, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                      len(LATENCY_BUCKETS))
+        with self._lock:
+            endpoint = self._endpoint(endpoint_class(url))
+            endpoint['requests'] += 1
+            endpoint['statuses'][str(status)] = endpoint['statuses'].get(str(status), 0) + 1
+            if from_cache:
+                endpoint['cache_hits'] += 1
+            endpoint['latency_sum'] += seconds
+            endpoint['latency_max'] = max(endpoint['latency_max'], seconds)
+            endpoint['buckets'][bucket] += 1
+
+    def record_retry(self, url: str, reason: str) -> None:
+        """Count a retry of a request (``server_error``, ``connection`` or ``rate_limit``)."""
+        with self._lock:
+            retries = self._endpoint(endpoint_class(url))['retries']
+            retries[reason] = retries.get(reason, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Add the time spent in the ``with`` block to stage ``name``."""
+        start = time.perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.stage(name):
+                    yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self._stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                stage['seconds'] += elapsed
+                stage['calls'] += 1
+
+    def to_dict(self, client=None) -> Dict[str, Any]:
+        """Metrics as a JSON-serialisable dict, with cache and quota figures from ``client`` if given."""
+        with self._lock:
+            endpoints = {}
+            for name in sorted(self._endpoints):
+                endpoint = self._endpoints[name]
+                cumulative, buckets = 0, {}
+                for bound, count in zip([*LATENCY_BUCKETS, '+Inf'], endpoint['buckets']):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                endpoints[name] = {
+                    'requests': endpoint['requests'],
+                    'cache_hits': endpoint['cache_hits'],
+                    'statuses': dict(sorted(endpoint['statuses'].items())),
+                    'retries': dict(sorted(endpoint['retries'].items())),
+                    'latency': {
+                        'sum_s': round(endpoint['latency_sum'], 4),
+                        'mean_s': round(endpoint['latency_sum'] / endpoint['requests'], 4) if endpoint['requests'] else 0,
+                        'max_s': round(endpoint['latency_max'], 4),
+                        'buckets': buckets
+                    }
+                }
+            stages = {name: {'seconds': round(stage['seconds'], 4), 'calls': stage['calls']}
+                      for name, stage in self._stages.items()}
+
+        metrics = {
+            'script': self.script,
+            'started_at': self.started_at.isoformat(),
+            'duration_s': round(time.perf_counter() - self._start, 4),
+            'totals': {
+                'requests': sum(endpoint['requests'] for endpoint in endpoints.values()),
+                'cache_hits': sum(endpoint['cache_hits'] for endpoint in endpoints.values()),
+                'retries': sum(sum(endpoint['retries'].values()) for endpoint in endpoints.values()),
+                # Failed connections and 5xx; 404s are normal answers (e.g. no README)
+                'errors': sum(count for endpoint in endpoints.values()
+                              for status, count in endpoint['statuses'].items()
+                              if status == 'error' or int(status) >= 500)
+            },
+            'stages': stages,
+            'endpoints': endpoints
+        }
+        if client is not None:
+            governor = client.governor.stats()
+            metrics['quota'] = {
+                'used': governor['quota_used'],
+                'remaining': governor['remaining'],
+                'limit': governor['limit'],
+                'rate_limit_waits': governor['throttle_events']
+            }
+            metrics['cache'] = client.cache.stats()
+        return metrics
+
+    def export(self, client=None, output_file: str = DEFAULT_METRICS_FILE,
+               prometheus_file: Optional[str] = DEFAULT_PROMETHEUS_FILE, step_summary: bool = True) -> bool:
+        """Write this run's section of the metrics file, the Prometheus file and the job summary.
+
+        Each script owns one section of ``output_file`` (like the run metadata),
+        so the scripts of one workflow run end up side by side; the Prometheus
+        file is regenerated from every section.
+        """
+        metrics = self.to_dict(client)
+        try:
+            try:
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    sections = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                sections = {}
+            sections[self.script] = metrics
+
+            if os.path.dirname(output_file):
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(sections, f, indent=2, sort_keys=True)
+
+            if prometheus_file:
+                with open(prometheus_file, 'w', encoding='utf-8') as f:
+                    f.write(prometheus_text(sections))
+        except OSError as e:
+            logger.error(f"Error writing pipeline metrics: {e}")
+            return False
+
+        if step_summary:
+            append_step_summary(metrics)
+        logger.info(f"Pipeline metrics: {metrics['totals']['requests']} requests, "
+                    f"{metrics['totals']['retries']} retries, written to {output_file}")
+        return True
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+def prometheus_text(sections: Dict[str, Dict[str, Any]]) -> str:
+    """Render metrics sections in the Prometheus text exposition format."""
+    families: Dict[str, Dict[str, Any]] = {}
+
+    def add(name: str, kind: str, help_text: str, labels: str, value: Any) -> None:
+        family = families.setdefault(name, {'kind': kind, 'help': help_text, 'samples': []})
+        family['samples'].append(f'{name}{labels} {value}')
+
+    for script, metrics in sorted(sections.items()):
+        add('solutions_exchange_run_duration_seconds', 'gauge', 'Wall time of the script run.',
+            _labels(script=script), metrics['duration_s'])
+        for stage, values in metrics['stages'].items():
+            add('solutions_exchange_stage_duration_seconds', 'gauge',
+                'Time spent in a pipeline stage, summed over worker threads.',
+                _labels(script=script, stage=stage), values['seconds'])
+        for endpoint, values in metrics['endpoints'].items():
+            for status, count in values['statuses'].items():
+                add('solutions_exchange_github_requests_total', 'counter', 'GitHub API request attempts.',
+                    _labels(script=script, endpoint=endpoint, status=status), count)
+            for reason, count in values['retries'].items():
+                add('solutions_exchange_github_retries_total', 'counter', 'GitHub API request retries.',
+                    _labels(script=script, endpoint=endpoint, reason=reason), count)
+            add('solutions_exchange_github_cache_hits_total', 'counter',
+                'Requests answered from the HTTP cache (304 Not Modified).',
+                _labels(script=script, endpoint=endpoint), values['cache_hits'])
+            histogram = 'solutions_exchange_github_request_duration_seconds'
+            family = families.setdefault(histogram, {'kind': 'histogram', 'help': 'GitHub API request latency.',
+                                                     'samples': []})
+            # The JSON file stores bucket bounds as sorted string keys; put them back in numeric order
+            for bound, count in sorted(values['latency']['buckets'].items(), key=lambda item: float(item[0])):
+                family['samples'].append(
+                    f"{histogram}_bucket{_labels(script=script, endpoint=endpoint, le=bound)} {count}")
+            family['samples'].append(
+                f"{histogram}_sum{_labels(script=script, endpoint=endpoint)} {values['latency']['sum_s']}")
+            family['samples'].append(
+                f"{histogram}_count{_labels(script=script, endpoint=endpoint)} {values['requests']}")
+        quota = metrics.get('quota')
+        if quota:
+            add('solutions_exchange_github_quota_used', 'gauge', 'Rate limit quota used by the run.',
+                _labels(script=script), quota['used'])
+            if quota['remaining'] is not None:
+                add('solutions_exchange_github_quota_remaining', 'gauge', 'Rate limit quota left after the run.',
+                    _labels(script=script), quota['remaining'])
+            add('solutions_exchange_github_rate_limit_waits_total', 'counter', 'Waits for a rate limit to reset.',
+                _labels(script=script), quota['rate_limit_waits'])
+
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        lines.extend(family['samples'])
+    return '\n'.join(lines) + '\n'
+
+def summary_markdown(metrics: Dict[str, Any]) -> str:
+    """Markdown tables of one run's requests and stages for the workflow job summary."""
+    lines = [f"### GitHub API usage: `{metrics['script']}`", '']
+    totals = metrics['totals']
+    line = (f"{totals['requests']} requests, {totals['cache_hits']} from cache, {totals['retries']} retries, "
+            f"{totals['errors']} errors in {metrics['duration_s']:.1f}s")
+    if metrics.get('quota'):
+        line += f"; quota used {metrics['quota']['used']}, remaining {metrics['quota']['remaining']}"
+    lines += [line, '',
+              '| Endpoint | Requests | Cache hits | Retries | Statuses | Mean ms | Max ms |',
+              '|---|---:|---:|---:|---|---:|---:|']
+    for name, endpoint in metrics['endpoints'].items():
+        statuses = ', '.join(f'{status}: {count}' for status, count in endpoint['statuses'].items())
+        lines.append(f"| {name} | {endpoint['requests']} | {endpoint['cache_hits']} | "
+                     f"{sum(endpoint['retries'].values())} | {statuses} | "
+                     f"{endpoint['latency']['mean_s'] * 1000:.0f} | {endpoint['latency']['max_s'] * 1000:.0f} |")
+    if metrics['stages']:
+        lines += ['', '| Stage | Seconds | Calls |', '|---|---:|---:|']
+        for name, stage in metrics['stages'].items():
+            lines.append(f"| {name} | {stage['seconds']:.2f} | {stage['calls']} |")
+    return '\n'.join(lines) + '\n\n'
+
+def append_step_summary(metrics: Dict[str, Any]) -> bool:
+    """Append the summary tables to ``$GITHUB_STEP_SUMMARY`` when running in GitHub Actions."""
+    summary_file = os.getenv('GITHUB_STEP_SUMMARY')
+    if not summary_file:
+        return False
+    try:
+        with open(summary_file, 'a', encoding='utf-8') as f:
+            f.write(summary_markdown(metrics))
+        return True
+    except OSError as e:
+        logger.warning(f"Could not write job summary: {e}")
+        return False
@@ -13,6 +13,10 @@ import logging
 from datetime import datetime
 from typing import Dict, Any
 
+from github_client import GitHubClient, GITHUB_API_URL
+from pipeline_metrics import PipelineMetrics
+from utils import update_run_metadata
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -27,11 +31,9 @@ class NHSWalesPrivateMetricsFetcher:
             logger.error("GitHub token not found. Set solutions_exchange_secret environment variable.")
             sys.exit(1)
         
-        self.headers = {
-            'Authorization': f'token {self.github_token}',
-            'Accept': 'application/vnd.github.v3+json',
-            'User-Agent': 'NHS-Wales-Solutions-Exchange/1.0'
-        }
+        # Pooled, retrying client shared with the other fetch scripts
+        self.metrics = PipelineMetrics('private_repo_and_user_count')
+        self.client = GitHubClient(self.github_token, metrics=self.metrics)
         logger.info("GitHub token found. Using API calls to fetch private repository data.")
         
         # Same organizations as update_repositories.py
@@ -69,11 +71,11 @@ class NHSWalesPrivateMetricsFetcher:
         logger.info(f"Fetching ALL repositories for organization: {organization}")
         
         while True:
-            api_url = f'https://api.github.com/orgs/{organization}/repos'
+            api_url = f'{GITHUB_API_URL}/orgs/{organization}/repos'
             params = {'per_page': 100, 'page': page, 'type': 'all'}  # 'all' includes private repos
             
             try:
-                response = requests.get(api_url, headers=self.headers, params=params, timeout=30)
+                response = self.client.get(api_url, params=params)
                 
                 if response.status_code == 404:
                     logger.warning(f"Organization {organization} not found or not accessible")
@@ -117,7 +119,8 @@ class NHSWalesPrivateMetricsFetcher:
         for org in self.organizations:
             try:
                 logger.info(f"Processing organization: {org}")
-                repo_counts = self.get_organization_repo_count(org)
+                with self.metrics.stage('fetch'):
+                    repo_counts = self.get_organization_repo_count(org)
                 
                 total_private_repos += repo_counts["private_repos"]
                 total_public_repos += repo_counts["public_repos"]
@@ -132,13 +135,14 @@ class NHSWalesPrivateMetricsFetcher:
                 continue
         
         logger.info(f"FINAL TOTALS: private={total_private_repos}, public={total_public_repos}, orgs={organization_count}")
+        self.client.log_stats()
+        self.client.close()
         
         return {
             "private_repos": total_private_repos,
             "public_repos": total_public_repos,
             "organizations": organization_count,
             "accessible_organizations": accessible_orgs,
-            "generated_at": datetime.now().isoformat(),
             "source": "github_api"
         }
 
@@ -158,8 +162,12 @@ def main():
         fetcher = NHSWalesPrivateMetricsFetcher()
         metrics = fetcher.get_all_metrics()
         
-        # Save to file for web pages to use
-        save_metrics_to_file(metrics, output_path)
+        # Save to file for web pages to use; the run time goes to the run metadata
+        # so the metrics file only changes when the counts do
+        with fetcher.metrics.stage('save'):
+            save_metrics_to_file(metrics, output_path)
+            update_run_metadata('private_repo_and_user_count', {'generated_at': datetime.now().isoformat()})
+        fetcher.metrics.export(fetcher.client)
         
         # Also print to stdout for direct use
         print(json.dumps({
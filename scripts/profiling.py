@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Stage Profiler
+Optional cProfile and tracemalloc profiling of pipeline stages (the --profile option)
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+# Frames kept per allocation traceback, and the share of a stage's time below which
+# call paths are left out of the collapsed stacks
+TRACEMALLOC_FRAMES = 5
+MIN_STACK_SHARE = 0.001
+
+class StageProfiler:
+    """Profiles named stages with cProfile and tracemalloc.
+
+    Each ``stage()`` call profiles the calling thread; calls of the same stage
+    (for example once per organization from a worker pool) are merged. At the
+    end of a run ``write()`` produces, in ``output_dir``:
+
+    - ``<stage>.pstats``: cProfile stats, readable with ``pstats`` or snakeviz
+    - ``<stage>.allocations.txt``: top allocation sites by memory still held at the end of the stage
+    - ``stacks.collapsed``: call stacks in the collapsed format of flamegraph.pl and speedscope,
+      rebuilt from the cProfile call graph with each stage as the root frame
+    - ``summary.txt``: time, allocations and top functions per stage
+
+    Allocations are measured per stage from a tracemalloc snapshot taken when
+    the stage first starts to one taken whenever it stops running; the two
+    are compared in ``write()`` once tracing has stopped, because comparing
+    snapshots while tracing is on is slow. tracemalloc is process-wide, so
+    allocations made by other threads or interleaved stages in that span
+    are counted towards the stage. A profiler that is not enabled does
+    nothing: ``stage()`` only yields.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_PROFILE_DIR, enabled: bool = True, top_n: int = 25):
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.top_n = top_n
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._allocations: Dict[str, List[Tuple[Tuple, List[int]]]] = {}
+        self._wall: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._unprofiled: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._first_snapshot: Dict[str, tracemalloc.Snapshot] = {}
+        self._last_snapshot: Dict[str, tracemalloc.Snapshot] = {}
+        self._lock = threading.Lock()
+        self._started_tracing = enabled and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the ``with`` block as (part of) stage ``name``."""
+        if not self.enabled:
+            yield
+            return
+
+        with self._lock:
+            if name not in self._first_snapshot:
+                self._first_snapshot[name] = tracemalloc.take_snapshot()
+            self._active[name] = self._active.get(name, 0) + 1
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; concurrent calls are timed only
+            profile = None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            self._record_call(name, profile, elapsed)
+
+    def _record_call(self, name: str, profile: Optional[cProfile.Profile], elapsed: float) -> None:
+        with self._lock:
+            self._wall[name] = self._wall.get(name, 0.0) + elapsed
+            self._calls[name] = self._calls.get(name, 0) + 1
+            if profile is None:
+                self._unprofiled[name] = self._unprofiled.get(name, 0) + 1
+            elif name in self._stats:
+                self._stats[name].add(profile)
+            else:
+                self._stats[name] = pstats.Stats(profile)
+
+            self._active[name] -= 1
+            if not self._active[name]:
+                self._last_snapshot[name] = tracemalloc.take_snapshot()
+
+    def _compare_snapshots(self) -> None:
+        """Allocation sites that grew between each stage's first and last snapshot, largest first."""
+        for name, after in self._last_snapshot.items():
+            growth = []
+            for difference in after.compare_to(self._first_snapshot[name], 'traceback'):
+                if difference.size_diff > 0 and not _is_profiler_frame(difference.traceback):
+                    growth.append((tuple((frame.filename, frame.lineno) for frame in difference.traceback),
+                                   [difference.size_diff, difference.count_diff]))
+            growth.sort(key=lambda item: item[1][0], reverse=True)
+            self._allocations[name] = growth
+        self._first_snapshot.clear()
+        self._last_snapshot.clear()
+
+    def write(self) -> bool:
+        """Write the pstats dumps, allocation reports, collapsed stacks and summary."""
+        if not self.enabled:
+            return False
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with self._lock:
+                self._compare_snapshots()
+                summary = []
+                collapsed = []
+                for name in self._wall:
+                    summary.extend(self._stage_summary(name))
+                    stats = self._stats.get(name)
+                    if stats is not None:
+                        stats.dump_stats(os.path.join(self.output_dir, f'{_slug(name)}.pstats'))
+                        collapsed.extend(collapsed_stacks(stats, root=name))
+                    with open(os.path.join(self.output_dir, f'{_slug(name)}.allocations.txt'), 'w',
+                              encoding='utf-8') as f:
+                        f.write(self._allocation_report(name))
+
+            with open(os.path.join(self.output_dir, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(collapsed) + ('\n' if collapsed else ''))
+            summary.append(f"Traced memory: {current / 1024 / 1024:.1f} MB at the end, {peak / 1024 / 1024:.1f} MB peak")
+            with open(os.path.join(self.output_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(summary) + '\n')
+        except OSError as e:
+            logger.error(f"Error writing profile to {self.output_dir}: {e}")
+            return False
+
+        logger.info(f"Profile written to {self.output_dir}")
+        return True
+
+    def _allocation_report(self, name: str) -> str:
+        lines = [f"Top {self.top_n} allocation sites for stage '{name}' (memory still held when the stage ended)", '']
+        for rank, (traceback, (size, count)) in enumerate(self._allocations.get(name, [])[:self.top_n], 1):
+            lines.append(f"#{rank}: {size / 1024:.1f} KiB in {count} blocks")
+            # Most recent call first
+            for filename, lineno in reversed(traceback):
+                lines.append(f"    {filename}:{lineno}")
+            lines.append('')
+        return '\n'.join(lines)
+
+    def _stage_summary(self, name: str) -> List[str]:
+        allocated = sum(size for _, (size, _) in self._allocations.get(name, []))
+        lines = [f"== {name}: {self._wall[name]:.3f}s wall over {self._calls[name]} calls, "
+                 f"{allocated / 1024 / 1024:.1f} MB allocated and held"]
+        if self._unprofiled.get(name):
+            lines.append(f"   ({self._unprofiled[name]} concurrent calls were timed but not profiled)")
+        stats = self._stats.get(name)
+        if stats is not None:
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            lines.append(output.getvalue().strip())
+        lines.append('')
+        return lines
+
+def _is_profiler_frame(traceback) -> bool:
+    return any(frame.filename in (__file__, tracemalloc.__file__) for frame in traceback)
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+
+def _frame_label(function: Tuple[str, int, str]) -> str:
+    filename, lineno, name = function
+    if filename == '~':
+        # Built-in functions, e.g. "<method 'acquire' of '_thread.lock' objects>"
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+def collapsed_stacks(stats: pstats.Stats, root: str = '') -> List[str]:
+    """Call stacks with their self time in microseconds, one ``a;b;c value`` line each.
+
+    cProfile records caller -> callee edges rather than full stacks, so
+    stacks are rebuilt by walking the call graph from its entry points and
+    splitting each function's time between its callers in proportion to the
+    time spent under each. Recursive calls are cut at the first repeat and
+    paths below ``MIN_STACK_SHARE`` of the total are dropped.
+    """
+    entries = stats.stats  # function -> (primitive calls, calls, own time, cumulative time, callers)
+    callees: Dict[Any, Dict[Any, float]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[function] = edge[3]
+
+    roots = [function for function, entry in entries.items() if not entry[4]]
+    total = sum(entries[function][3] for function in roots) or 1.0
+    threshold = total * MIN_STACK_SHARE
+    weights: Dict[str, float] = {}
+
+    def visit(function, path: List[str], seen: frozenset, weight: float) -> None:
+        _, _, own_time, cumulative, _ = entries[function]
+        share = weight / cumulative if cumulative else 0.0
+        stack = path + [_frame_label(function)]
+        key = ';'.join(stack)
+        weights[key] = weights.get(key, 0.0) + own_time * share
+        for callee, edge_time in callees.get(function, {}).items():
+            callee_weight = edge_time * share
+            if callee in seen or callee_weight < threshold:
+                continue
+            visit(callee, stack, seen | {callee}, callee_weight)
+
+    prefix = [root] if root else []
+    for function in roots:
+        if entries[function][3] >= threshold:
+            visit(function, prefix, frozenset([function]), entries[function][3])
+
+    return [f"{stack} {round(weight * 1_000_000)}" for stack, weight in weights.items()
+            if round(weight * 1_000_000) > 0]
+
+def add_profile_arguments(parser) -> None:
+    """Add the ``--profile`` and ``--profile-dir`` options to a script's argument parser."""
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each stage with cProfile and tracemalloc")
+    parser.add_argument('--profile-dir', default=None,
+                        help=f"Directory for profile output (default: {DEFAULT_PROFILE_DIR}/<script>)")
+
+def profiler_from_args(args, script: str) -> Optional[StageProfiler]:
+    """Profiler for a script run, or None (nothing is started) unless ``--profile`` was given."""
+    if not args.profile:
+        return None
+    return StageProfiler(args.profile_dir or os.path.join(DEFAULT_PROFILE_DIR, script))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Artifact Publisher
+Writes content-hashed (and optionally precompressed) copies of the data files for deployment
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import logging
+from pathlib import Path
+from typing import Dict, List, Any
+
+# Add scripts directory to path for imports
+sys.path.append(str(Path(__file__).parent))
+
+from utils import content_hash
+
+try:
+    import brotli
+except ImportError:  # Optional: .br files are skipped without it
+    brotli = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = 'data'
+DIST_DIR = os.path.join(DATA_DIR, 'dist')
+POINTER_FILE = os.path.join(DATA_DIR, 'published.json')
+
+def find_artifacts(data_dir: str = DATA_DIR) -> List[str]:
+    """List the JSON data artifacts to publish, excluding publisher output."""
+    artifacts = glob.glob(os.path.join(data_dir, '**', '*.json'), recursive=True)
+    excluded = {os.path.normpath(POINTER_FILE)}
+    return sorted(
+        path for path in artifacts
+        if os.path.normpath(path) not in excluded
+        and not os.path.normpath(path).startswith(os.path.normpath(DIST_DIR) + os.sep)
+    )
+
+def write_compressed(path: str, data: bytes, write: bool = True) -> Dict[str, int]:
+    """Measure, and with ``write`` save, .gz (and .br when brotli is installed) siblings of an artifact."""
+    sizes = {'bytes': len(data)}
+
+    # mtime=0 keeps the gzip output byte-identical for identical input
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    if write:
+        with open(f'{path}.gz', 'wb') as f:
+            f.write(gz_data)
+    sizes['gzip_bytes'] = len(gz_data)
+
+    if brotli is not None:
+        br_data = brotli.compress(data, quality=11)
+        if write:
+            with open(f'{path}.br', 'wb') as f:
+                f.write(br_data)
+        sizes['br_bytes'] = len(br_data)
+
+    return sizes
+
+def publish_artifacts(data_dir: str = DATA_DIR, dist_dir: str = DIST_DIR,
+                      pointer_file: str = POINTER_FILE,
+                      precompress: bool = False) -> Dict[str, Any]:
+    """Write content-hashed copies of the top-level data files and their pointer manifest.
+
+    Top-level ``data/*.json`` files are copied to ``dist/<name>.<hash>.json``
+    so they can be cached as immutable; the pointer manifest maps each logical
+    name to its current hashed copy and its compressed sizes, and the site
+    pages load data through it. Hashed copies that are no longer referenced
+    are removed. With ``precompress``, ``.gz``/``.br`` siblings are also
+    written for every artifact, for hosts that serve them (GitHub Pages does
+    not, and compresses on the fly instead).
+    """
+    if precompress and brotli is None:
+        logger.warning("brotli is not installed; skipping .br files")
+
+    os.makedirs(dist_dir, exist_ok=True)
+    pointers = {}
+    current = set()
+    totals = {'bytes': 0, 'gzip_bytes': 0, 'br_bytes': 0}
+
+    for path in find_artifacts(data_dir):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        sizes = write_compressed(path, data, write=precompress)
+        for key, value in sizes.items():
+            totals[key] += value
+
+        if os.path.dirname(os.path.normpath(path)) != os.path.normpath(data_dir):
+            continue  # API shards are already addressed through their manifest hashes
+
+        name = os.path.basename(path)
+        digest = content_hash(data)
+        hashed_name = f"{os.path.splitext(name)[0]}.{digest}.json"
+        hashed_path = os.path.join(dist_dir, hashed_name)
+        if not os.path.exists(hashed_path):
+            with open(hashed_path, 'wb') as f:
+                f.write(data)
+        if precompress:
+            write_compressed(hashed_path, data)
+
+        current.update({hashed_name, f'{hashed_name}.gz', f'{hashed_name}.br'})
+        pointers[name] = {
+            'path': os.path.relpath(hashed_path, data_dir).replace(os.sep, '/'),
+            'hash': digest,
+            **sizes
+        }
+
+    for stale in os.listdir(dist_dir):
+        if stale not in current:
+            os.remove(os.path.join(dist_dir, stale))
+
+    with open(pointer_file, 'w', encoding='utf-8') as f:
+        json.dump(pointers, f, indent=2, sort_keys=True)
+
+    logger.info(f"Published {len(pointers)} hashed artifacts"
+                + (" with precompressed siblings" if precompress else "") + "; "
+                f"{totals['bytes']:,} bytes -> {totals['gzip_bytes']:,} gzip"
+                + (f", {totals['br_bytes']:,} brotli" if brotli is not None else ""))
+    return pointers
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Write content-hashed data artifacts for deployment")
+    parser.add_argument('--precompress', action='store_true',
+                        help="Also write .gz/.br siblings, for hosts that serve precompressed files")
+    args = parser.parse_args()
+
+    try:
+        publish_artifacts(precompress=args.precompress)
+    except Exception as e:
+        logger.error(f"Failed to publish artifacts: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Rate Limit Governor
+Tracks GitHub API quota and adapts request concurrency for the fetch scripts
+"""
+
+import json
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Iterator
+
+import requests
+
+from http_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = os.path.join(DEFAULT_CACHE_DIR, 'rate_limit.json')
+
+class RateLimitGovernor:
+    """Central rate-limit governor for GitHub API requests.
+
+    Every response updates the known quota from ``X-RateLimit-Remaining`` /
+    ``X-RateLimit-Reset``. Requests are admitted through a concurrency window
+    that grows additively on success and halves whenever GitHub signals a
+    primary or secondary limit (AIMD). When the remaining quota drops to
+    ``reserve`` the governor pauses until the reset time instead of letting
+    requests fail.
+
+    The window is shared by all threads using the governor; the last known
+    quota is persisted to ``state_file`` so the next script in the same run
+    starts from it rather than from an empty view.
+    """
+
+    def __init__(self, state_file: str = DEFAULT_STATE_FILE, reserve: int = 50,
+                 initial_concurrency: float = 4, min_concurrency: float = 1,
+                 max_concurrency: float = 16, max_wait: float = 3900):
+        self.state_file = state_file
+        self.reserve = reserve
+        self.concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.quota_used = 0
+        self.throttle_events = 0
+
+        self._active = 0
+        self._last_saved = 0.0
+        self._condition = threading.Condition()
+
+        self._load_state()
+
+    def _load_state(self) -> None:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        # Ignore state from a previous rate-limit window
+        if state.get('reset_at') and state['reset_at'] > time.time():
+            self.limit = state.get('limit')
+            self.remaining = state.get('remaining')
+            self.reset_at = state['reset_at']
+
+    def save_state(self) -> None:
+        """Persist the last known quota for later scripts in the run."""
+        if self.reset_at is None:
+            return
+        state = {'limit': self.limit, 'remaining': self.remaining, 'reset_at': self.reset_at}
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning(f"Failed to save rate limit state: {e}")
+
+    def _wait_for_quota(self) -> None:
+        """Pause until the reset time if the remaining quota is at the reserve."""
+        while True:
+            with self._condition:
+                if self.remaining is None or self.remaining > self.reserve or not self.reset_at:
+                    return
+                wait = self.reset_at - time.time() + 1
+                if wait <= 0:
+                    # Window has rolled over; the next response refreshes the quota
+                    self.remaining = None
+                    return
+            wait = min(wait, self.max_wait)
+            logger.warning(f"GitHub quota at {self.remaining} requests; pausing {wait:.0f}s until reset")
+            time.sleep(wait)
+
+    def acquire(self) -> None:
+        """Wait for quota and a free slot in the concurrency window."""
+        self._wait_for_quota()
+        with self._condition:
+            while self._active >= max(int(self.concurrency), 1):
+                self._condition.wait()
+            self._active += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a request slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def update(self, response: requests.Response) -> None:
+        """Record quota headers from a response and adjust the window."""
+        headers = response.headers
+        with self._condition:
+            # Conditional requests answered with 304 are not charged by GitHub
+            if not getattr(response, 'from_cache', False):
+                self.quota_used += 1
+
+            if 'X-RateLimit-Remaining' in headers:
+                try:
+                    self.remaining = int(headers['X-RateLimit-Remaining'])
+                    self.reset_at = float(headers.get('X-RateLimit-Reset', 0)) or None
+                    if 'X-RateLimit-Limit' in headers:
+                        self.limit = int(headers['X-RateLimit-Limit'])
+                except ValueError:
+                    pass
+
+            if self.retry_after(response) is None:
+                # Additive increase: roughly +1 slot per window of successful requests
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+
+        if time.time() - self._last_saved > 1:
+            self._last_saved = time.time()
+            self.save_state()
+
+    def retry_after(self, response: requests.Response) -> Optional[float]:
+        """Seconds to wait if the response is a primary or secondary rate limit, else None."""
+        if response.status_code not in (403, 429):
+            return None
+
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(float(retry_after), 1)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 1)
+                except (TypeError, ValueError):
+                    return 60
+
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_at = float(response.headers.get('X-RateLimit-Reset', 0))
+            return max(reset_at - time.time() + 1, 1)
+
+        # Secondary limits are reported as 403/429 with a message but no headers
+        if response.status_code == 429 or 'rate limit' in response.text.lower():
+            return 60
+
+        return None  # A genuine permission error
+
+    def throttle(self, response: requests.Response) -> Optional[float]:
+        """Halve the window after a rate-limit response; returns the wait to apply."""
+        wait = self.retry_after(response)
+        if wait is None:
+            return None
+
+        with self._condition:
+            self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            self.throttle_events += 1
+
+        if wait > self.max_wait:
+            logger.error(f"Rate limit wait of {wait:.0f}s exceeds the {self.max_wait:.0f}s maximum")
+            return None
+
+        logger.warning(f"Rate limited by GitHub (HTTP {response.status_code}); "
+                       f"waiting {wait:.0f}s, concurrency now {self.concurrency:.1f}")
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Return quota and throttling counters for this run."""
+        return {
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'reset_at': self.reset_at,
+            'quota_used': self.quota_used,
+            'throttle_events': self.throttle_events,
+            'concurrency': round(self.concurrency, 1)
+        }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - README Probe
+README presence, size and last-modified time with at most one request per repository
+"""
+
+import json
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from github_client import GitHubClient, GITHUB_API_URL
+from http_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_CACHE = os.path.join(DEFAULT_CACHE_DIR, 'readme_probe.json')
+
+# Fields the probe adds to a repository record
+README_FIELDS = ['has_readme', 'readme_size', 'readme_last_modified']
+
+class ReadmeProbe:
+    """Looks up repository READMEs through the single ``/readme`` endpoint.
+
+    GitHub's ``/readme`` endpoint finds the preferred README in any of the
+    supported names and locations, so one request replaces probing several
+    file paths. Results are cached by repository id together with the
+    repository's ``pushed_at``: a README cannot change without a push, so an
+    unchanged repository is answered from the cache without any request.
+    """
+
+    def __init__(self, client: GitHubClient, cache_file: str = DEFAULT_PROBE_CACHE,
+                 max_workers: int = 8, enabled: bool = True):
+        self.client = client
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.enabled = enabled
+        self.requests = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = self._load_cache() if enabled else {}
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable README cache {self.cache_file}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Write the cache file atomically."""
+        if not self.enabled:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, sort_keys=True)
+        os.replace(tmp_path, self.cache_file)
+
+    def probe(self, repo: Dict[str, Any]) -> Dict[str, Any]:
+        """README fields for one repository.
+
+        If the lookup fails, the last known result for the repository is
+        returned instead (``has_readme`` is None only if there is none), so a
+        transient error does not read as the README having been removed.
+        """
+        key = str(repo.get('id'))
+        cached = self._cache.get(key)
+        if cached is not None and cached.get('pushed_at') == repo.get('pushed_at'):
+            with self._lock:
+                self.cached += 1
+            return {field: cached.get(field) for field in README_FIELDS}
+
+        result = {'has_readme': None, 'readme_size': None, 'readme_last_modified': None}
+        if not repo.get('pushed_at') and repo.get('size') == 0:
+            # Nothing has ever been pushed, so there is no README to look up
+            result['has_readme'] = False
+        else:
+            url = f"{GITHUB_API_URL}/repos/{repo['owner']['login']}/{repo['name']}/readme"
+            try:
+                response = self.client.get(url)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"README lookup failed for {repo.get('full_name')}: {e}")
+                return self._last_known(cached, result)
+            with self._lock:
+                self.requests += 1
+
+            if response.status_code == 200:
+                result['has_readme'] = True
+                result['readme_size'] = response.json().get('size')
+                result['readme_last_modified'] = response.headers.get('Last-Modified')
+            elif response.status_code == 404:
+                result['has_readme'] = False
+            else:
+                logger.warning(f"README lookup for {repo.get('full_name')} returned {response.status_code}")
+                return self._last_known(cached, result)
+
+        if self.enabled and repo.get('id') is not None:
+            with self._lock:
+                self._cache[key] = {'pushed_at': repo.get('pushed_at'), **result}
+        return result
+
+    @staticmethod
+    def _last_known(cached: Optional[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, Any]:
+        if cached is None:
+            return result
+        return {field: cached.get(field) for field in README_FIELDS}
+
+    def apply(self, repos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add README fields to every repository, probing concurrently."""
+        if not repos:
+            return repos
+        workers = max(1, min(self.max_workers, len(repos)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for repo, result in zip(repos, executor.map(self.probe, repos)):
+                repo.update(result)
+        return repos
+
+    def log_stats(self) -> None:
+        logger.info(f"README probe: {self.requests} requests, {self.cached} answered from cache")
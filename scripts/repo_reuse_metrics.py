@@ -1,15 +1,22 @@
 #!/usr/bin/env python3
 """
 NHS Wales Solutions Exchange - Repo Reuse Metrics
-Fetches forks, clones, and (if possible) downloads for all repos in data/repositories.json
-Saves results to data/reuse_metrics.json
+Fetches forks, clones, views, and (if possible) downloads for all repos in data/repositories.json
+Saves results to data/reuse_metrics.json and daily traffic history to data/traffic.sqlite
 """
 
 import requests
+import argparse
 import json
 import os
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from github_client import GitHubClient, GITHUB_API_URL
+from graphql_engine import GitHubGraphQLEngine
+from pipeline_metrics import PipelineMetrics
+from traffic_store import TrafficStore, TRAFFIC_KINDS, TRAFFIC_API_DAYS, DEFAULT_TRAFFIC_DB, DEFAULT_TRAFFIC_HISTORY_DIR
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,64 +37,188 @@ def load_repositories(path='data/repositories.json') -> List[Dict[str, Any]]:
         logger.error(f"Failed to load repositories: {e}")
         return []
 
-def fetch_repo_metrics(owner: str, repo: str, headers: Dict[str, str]) -> Dict[str, Any]:
-    base_url = f"https://api.github.com/repos/{owner}/{repo}"
+def fetch_release_downloads(base_url: str, client: GitHubClient) -> Optional[int]:
+    """Sum release asset downloads across every page of /releases."""
+    total_downloads = 0
+    url = base_url + "/releases"
+    params = {'per_page': 100}
+    while url:
+        r = client.get(url, params=params)
+        if r.status_code != 200:
+            return None
+        for release in r.json():
+            for asset in release.get('assets', []):
+                total_downloads += asset.get('download_count', 0)
+        # The next link already carries the query string
+        url = r.links.get('next', {}).get('url')
+        params = None
+    return total_downloads
+
+def fetch_repo_metrics(owner: str, repo: str, client: GitHubClient,
+                       enrichment: Optional[Dict[str, Any]] = None,
+                       snapshot: Optional[Dict[str, Any]] = None,
+                       traffic: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """Fetch reuse metrics for one repository.
+
+    Values already known are not requested again: forks and downloads come
+    from ``enrichment`` (GraphQL) when given (downloads only when all releases
+    fit in the query; otherwise they are paged through REST), forks otherwise from the
+    ``snapshot`` record in data/repositories.json. Traffic is skipped when the
+    snapshot shows the token lacks push access (GitHub would return 403), and
+    releases are skipped for empty repositories. The per-day traffic buckets
+    are added to ``traffic`` by kind when it is given.
+    """
+    base_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+    snapshot = snapshot or {}
     metrics = {}
     # Forks
-    r = requests.get(base_url, headers=headers)
-    if r.status_code == 200:
-        data = r.json()
-        metrics['forks_count'] = data.get('forks_count', 0)
-    else:
-        metrics['forks_count'] = None
-    # Clones (requires repo admin)
-    r = requests.get(base_url + "/traffic/clones", headers=headers)
-    if r.status_code == 200:
-        data = r.json()
-        metrics['clones_count'] = data.get('count', 0)
-        metrics['clones_uniques'] = data.get('uniques', 0)
+    if enrichment is not None:
+        metrics['forks_count'] = enrichment.get('forks_count', 0)
+    elif snapshot.get('forks_count') is not None:
+        metrics['forks_count'] = snapshot['forks_count']
     else:
-        metrics['clones_count'] = None
-        metrics['clones_uniques'] = None
+        r = client.get(base_url)
+        if r.status_code == 200:
+            data = r.json()
+            metrics['forks_count'] = data.get('forks_count', 0)
+        else:
+            metrics['forks_count'] = None
+    # Clones and views (require push access)
+    permissions = snapshot.get('permissions')
+    has_push = permissions is None or permissions.get('push') or permissions.get('admin')
+    for kind in TRAFFIC_KINDS:
+        metrics[f'{kind}_count'] = None
+        metrics[f'{kind}_uniques'] = None
+        if not has_push:
+            continue
+        r = client.get(base_url + f"/traffic/{kind}")
+        if r.status_code == 200:
+            data = r.json()
+            metrics[f'{kind}_count'] = data.get('count', 0)
+            metrics[f'{kind}_uniques'] = data.get('uniques', 0)
+            if traffic is not None:
+                traffic[kind] = data.get(kind, [])
     # Downloads (GitHub API only supports releases)
-    r = requests.get(base_url + "/releases", headers=headers)
-    if r.status_code == 200:
-        releases = r.json()
-        total_downloads = 0
-        for release in releases:
-            for asset in release.get('assets', []):
-                total_downloads += asset.get('download_count', 0)
-        metrics['downloads_count'] = total_downloads
+    if enrichment is not None and enrichment.get('downloads_count') is not None:
+        metrics['downloads_count'] = enrichment['downloads_count']
+    elif snapshot.get('size') == 0:
+        metrics['downloads_count'] = 0  # An empty repository has no tags, so no releases
     else:
-        metrics['downloads_count'] = None
+        metrics['downloads_count'] = fetch_release_downloads(base_url, client)
     return metrics
 
-def main():
-    token = get_github_token()
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3+json',
-        'User-Agent': 'NHS-Wales-Solutions-Exchange/metrics'
-    }
-    repos = load_repositories()
-    results = []
+def failed_metrics(snapshot: Dict[str, Any], enrichment: Optional[Dict[str, Any]], error: Exception) -> Dict[str, Any]:
+    """Metrics row for a repository whose requests failed.
+
+    Forks come from the listing (or GraphQL) data, which needs no request;
+    traffic and downloads are unknown (None) rather than zero, and ``error``
+    says why, so the repository stays in the output.
+    """
+    source = enrichment if enrichment is not None else snapshot
+    metrics: Dict[str, Any] = {'forks_count': source.get('forks_count')}
+    for kind in TRAFFIC_KINDS:
+        metrics[f'{kind}_count'] = None
+        metrics[f'{kind}_uniques'] = None
+    metrics['downloads_count'] = None
+    metrics['error'] = f"{type(error).__name__}: {error}"
+    return metrics
+
+def unique_repositories(repos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop records without an owner/name and duplicates of the same repository."""
+    seen = set()
+    unique = []
     for repo in repos:
         owner = repo.get('owner', {}).get('login')
         name = repo.get('name')
         if not owner or not name:
             continue
+        key = f'{owner}/{name}'.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(repo)
+    return unique
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch reuse metrics for all repositories")
+    parser.add_argument('--graphql', action='store_true',
+                        help="Fetch forks and release downloads in batched GraphQL queries")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Number of repositories processed concurrently (default: 8)")
+    parser.add_argument('--traffic-db', default=DEFAULT_TRAFFIC_DB,
+                        help=f"SQLite store of daily clone and view history (default: {DEFAULT_TRAFFIC_DB})")
+    parser.add_argument('--history-dir', default=DEFAULT_TRAFFIC_HISTORY_DIR,
+                        help=f"Committed monthly export of the traffic history (default: {DEFAULT_TRAFFIC_HISTORY_DIR})")
+    args = parser.parse_args()
+
+    token = get_github_token()
+    workers = max(1, args.workers)
+    pipeline_metrics = PipelineMetrics('repo_reuse_metrics')
+    client = GitHubClient(token, user_agent='NHS-Wales-Solutions-Exchange/metrics', pool_size=workers,
+                          metrics=pipeline_metrics)
+    repos = unique_repositories(load_repositories())
+
+    enrichments = None
+    if args.graphql:
+        names = [(repo['owner']['login'], repo['name']) for repo in repos]
+        try:
+            with pipeline_metrics.stage('fetch'):
+                enrichments = GitHubGraphQLEngine(client).fetch_repositories(names)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"GraphQL enrichment failed, falling back to REST: {e}")
+
+    def collect(repo: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, Any]]]]:
+        owner = repo['owner']['login']
+        name = repo['name']
         logger.info(f"Fetching metrics for {owner}/{name}")
-        metrics = fetch_repo_metrics(owner, name, headers)
-        results.append({
+        enrichment = enrichments.get(f'{owner}/{name}') if enrichments is not None else None
+        traffic = {}
+        try:
+            with pipeline_metrics.stage('fetch'):
+                metrics = fetch_repo_metrics(owner, name, client, enrichment, snapshot=repo, traffic=traffic)
+        except requests.exceptions.RequestException as e:
+            # Includes an open circuit for the organization
+            logger.error(f"Failed to fetch metrics for {owner}/{name}: {e}")
+            metrics, traffic = failed_metrics(repo, enrichment, e), {}
+        except Exception as e:
+            # An unexpected payload fails this repository, not the whole run
+            logger.error(f"Error processing metrics for {owner}/{name}: {e}")
+            metrics, traffic = failed_metrics(repo, enrichment, e), {}
+        return {
             'owner': owner,
             'name': name,
             **metrics
-        })
+        }, traffic
+
+    # Results keep the order of data/repositories.json; buckets are stored from
+    # this thread since the SQLite connection is not shared with the workers
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor, TrafficStore(args.traffic_db) as store:
+        with pipeline_metrics.stage('save'):
+            # The database is only cached; the committed export is the durable copy
+            store.restore_history(args.history_dir)
+        stored = 0
+        for record, traffic in executor.map(collect, repos):
+            results.append(record)
+            with pipeline_metrics.stage('save'):
+                for kind, buckets in traffic.items():
+                    stored += store.ingest(record['owner'], record['name'], kind, buckets)
+        logger.info(f"Stored {stored} new or updated daily traffic buckets in {args.traffic_db}")
+        with pipeline_metrics.stage('save'):
+            store.export_history(args.history_dir, since=store.window_start(TRAFFIC_API_DAYS + 1))
+            store.export_rollups()
+
     # Save results
     out_path = 'data/reuse_metrics.json'
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
-    logger.info(f"Saved metrics for {len(results)} repos to {out_path}")
+    with pipeline_metrics.stage('save'):
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    failed = sum(1 for record in results if record.get('error'))
+    logger.info(f"Saved metrics for {len(results)} repos to {out_path}"
+                + (f" ({failed} failed; their traffic and downloads are null)" if failed else ""))
+    client.log_stats()
+    pipeline_metrics.export(client)
+    client.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Snapshot Store
+Daily repository snapshots in SQLite for growth and trend queries
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Union
+
+from history_export import month_of, history_months, read_history, write_history
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DB = os.getenv('SOLUTIONS_EXCHANGE_SNAPSHOT_DB', 'data/snapshots.sqlite')
+DEFAULT_SNAPSHOT_HISTORY_DIR = os.getenv('SOLUTIONS_EXCHANGE_SNAPSHOT_HISTORY', 'data/history/snapshots')
+
+# Column name -> function reading it from an enhanced repository record
+SNAPSHOT_COLUMNS = {
+    'full_name': lambda repo: repo.get('full_name'),
+    'name': lambda repo: repo.get('name'),
+    'org': lambda repo: (repo.get('owner') or {}).get('login'),
+    'language': lambda repo: repo.get('language'),
+    'visibility': lambda repo: repo.get('visibility'),
+    'created_at': lambda repo: repo.get('created_at'),
+    'pushed_at': lambda repo: repo.get('pushed_at'),
+    'stars': lambda repo: repo.get('stargazers_count', 0),
+    'forks': lambda repo: repo.get('forks_count', 0),
+    'open_issues': lambda repo: repo.get('open_issues_count', 0),
+    'size': lambda repo: repo.get('size', 0),
+    'quality_score': lambda repo: repo.get('quality_score'),
+    'featured': lambda repo: int(bool(repo.get('featured'))),
+    'archived': lambda repo: int(bool(repo.get('archived')))
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    repo_id INTEGER NOT NULL,
+    snapshot_date TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    org TEXT,
+    language TEXT,
+    visibility TEXT,
+    created_at TEXT,
+    pushed_at TEXT,
+    stars INTEGER,
+    forks INTEGER,
+    open_issues INTEGER,
+    size INTEGER,
+    quality_score INTEGER,
+    featured INTEGER,
+    archived INTEGER,
+    PRIMARY KEY (repo_id, snapshot_date)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS snapshots_date ON snapshots (snapshot_date);
+CREATE INDEX IF NOT EXISTS snapshots_org ON snapshots (org, snapshot_date);
+CREATE INDEX IF NOT EXISTS snapshots_language ON snapshots (language, snapshot_date);
+"""
+
+DateLike = Union[str, date, datetime]
+
+def _date_key(value: DateLike) -> str:
+    """ISO day (YYYY-MM-DD) for a date, datetime or ISO string."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+class SnapshotStore:
+    """Repository snapshots keyed by repository id and snapshot date.
+
+    One row is kept per repository per day; recording the same day again
+    replaces that day's rows, so reruns do not duplicate data.
+
+    The database itself is only cached between runs. ``export_history``
+    writes each day as a diff against the previous one to committed monthly
+    files and ``restore_history`` replays them into a database missing days.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_SNAPSHOT_DB):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def record_snapshot(self, repos: Iterable[Dict[str, Any]], snapshot_date: Optional[DateLike] = None) -> int:
+        """Store ``repos`` as the snapshot for ``snapshot_date`` (default today); returns rows written."""
+        day = _date_key(snapshot_date or datetime.now())
+        columns = ['repo_id', 'snapshot_date', *SNAPSHOT_COLUMNS]
+        # Rows are generated as executemany consumes them, so ``repos`` can be a stream
+        rows = (
+            (repo['id'], day, *(read(repo) for read in SNAPSHOT_COLUMNS.values()))
+            for repo in repos if repo.get('id') is not None
+        )
+        with self.connection:
+            self.connection.execute("DELETE FROM snapshots WHERE snapshot_date = ?", (day,))
+            written = self.connection.executemany(
+                f"INSERT OR REPLACE INTO snapshots ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                rows
+            ).rowcount
+        logger.info(f"Recorded snapshot of {written} repositories for {day} in {self.db_path}")
+        return written
+
+    def _snapshot_rows(self, day: Optional[str]) -> Dict[int, List[Any]]:
+        """Column values (in ``SNAPSHOT_COLUMNS`` order) by repository id for one snapshot date."""
+        if day is None:
+            return {}
+        rows = self.connection.execute(
+            f"SELECT repo_id, {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots WHERE snapshot_date = ?", (day,)
+        )
+        return {row[0]: list(row[1:]) for row in rows}
+
+    def _month_diffs(self, dates: List[str]) -> Iterator[Dict[str, Any]]:
+        """Export records for consecutive ``dates``: rows changed and ids removed since the previous date."""
+        previous = self.connection.execute(
+            "SELECT MAX(snapshot_date) FROM snapshots WHERE snapshot_date < ?", (dates[0],)
+        ).fetchone()[0]
+        state = self._snapshot_rows(previous)
+        for day in dates:
+            rows = self._snapshot_rows(day)
+            yield {
+                'snapshot_date': day,
+                'columns': list(SNAPSHOT_COLUMNS),
+                'changed': [[repo_id, *values] for repo_id, values in sorted(rows.items())
+                            if state.get(repo_id) != values],
+                'removed': sorted(set(state) - set(rows))
+            }
+            state = rows
+
+    def export_history(self, history_dir: str = DEFAULT_SNAPSHOT_HISTORY_DIR,
+                       since: Optional[DateLike] = None) -> int:
+        """Write the monthly history files for months from ``since`` (default all) and any not exported yet.
+
+        Each line is one snapshot date, holding the rows that changed and the
+        repository ids removed since the date before it. Returns the number of
+        months written.
+        """
+        exported = set(history_months(history_dir))
+        start = month_of(_date_key(since)) if since else ''
+        dates_by_month: Dict[str, List[str]] = {}
+        for day in self.snapshot_dates():
+            dates_by_month.setdefault(month_of(day), []).append(day)
+
+        months = [month for month in dates_by_month if month not in exported or month >= start]
+        for month in months:
+            write_history(history_dir, month, self._month_diffs(dates_by_month[month]))
+        return len(months)
+
+    def restore_history(self, history_dir: str = DEFAULT_SNAPSHOT_HISTORY_DIR) -> int:
+        """Replay the monthly history files and insert the dates the database is missing; returns dates restored."""
+        months = history_months(history_dir)
+        stored = set(self.snapshot_dates())
+        stored_months: Dict[str, int] = {}
+        for day in stored:
+            stored_months[month_of(day)] = stored_months.get(month_of(day), 0) + 1
+
+        # Cheap check first: a month is complete when it has as many dates as export lines
+        incomplete = False
+        for month in months:
+            with open(os.path.join(history_dir, f'{month}.jsonl'), 'r', encoding='utf-8') as f:
+                if sum(1 for line in f if line.strip()) > stored_months.get(month, 0):
+                    incomplete = True
+                    break
+        if not incomplete:
+            return 0
+
+        columns = ['repo_id', 'snapshot_date', *SNAPSHOT_COLUMNS]
+        state: Dict[int, Dict[str, Any]] = {}
+        restored: List[str] = []
+        with self.connection:
+            for month in months:
+                for record in read_history(history_dir, month):
+                    for repo_id in record['removed']:
+                        state.pop(repo_id, None)
+                    for repo_id, *values in record['changed']:
+                        state[repo_id] = dict(zip(record['columns'], values))
+
+                    day = record['snapshot_date']
+                    if day in stored:
+                        continue
+                    self.connection.executemany(
+                        f"INSERT OR REPLACE INTO snapshots ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' for _ in columns)})",
+                        ((repo_id, day, *(row.get(column) for column in SNAPSHOT_COLUMNS))
+                         for repo_id, row in state.items())
+                    )
+                    restored.append(day)
+
+        if restored:
+            logger.warning(f"Snapshot store was missing {len(restored)} snapshot dates "
+                           f"({restored[0]} to {restored[-1]}); restored them from {history_dir}")
+        return len(restored)
+
+    def snapshot_dates(self) -> List[str]:
+        """All recorded snapshot dates, oldest first."""
+        return [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT snapshot_date FROM snapshots ORDER BY snapshot_date"
+        )]
+
+    def latest_date(self, on_or_before: Optional[DateLike] = None) -> Optional[str]:
+        """Most recent snapshot date, optionally no later than ``on_or_before``."""
+        if on_or_before is None:
+            row = self.connection.execute("SELECT MAX(snapshot_date) FROM snapshots").fetchone()
+        else:
+            row = self.connection.execute(
+                "SELECT MAX(snapshot_date) FROM snapshots WHERE snapshot_date <= ?", (_date_key(on_or_before),)
+            ).fetchone()
+        return row[0]
+
+    def repositories(self, snapshot_date: Optional[DateLike] = None, org: Optional[str] = None,
+                     language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rows of one snapshot (default the latest), optionally filtered by org and language."""
+        day = _date_key(snapshot_date) if snapshot_date else self.latest_date()
+        query = "SELECT * FROM snapshots WHERE snapshot_date = ?"
+        params: List[Any] = [day]
+        if org is not None:
+            query += " AND org = ?"
+            params.append(org)
+        if language is not None:
+            query += " AND language = ?"
+            params.append(language)
+        return [dict(row) for row in self.connection.execute(query + " ORDER BY full_name", params)]
+
+    def repos_created_per_month(self, org: Optional[str] = None,
+                                snapshot_date: Optional[DateLike] = None) -> List[Dict[str, Any]]:
+        """Repositories created per month and organization, from one snapshot (default the latest)."""
+        day = _date_key(snapshot_date) if snapshot_date else self.latest_date()
+        query = ("SELECT org, substr(created_at, 1, 7) AS month, COUNT(*) AS repositories "
+                 "FROM snapshots WHERE snapshot_date = ? AND created_at IS NOT NULL")
+        params: List[Any] = [day]
+        if org is not None:
+            query += " AND org = ?"
+            params.append(org)
+        query += " GROUP BY org, month ORDER BY org, month"
+        return [dict(row) for row in self.connection.execute(query, params)]
+
+    def counts_over_time(self, field: str = 'org') -> List[Dict[str, Any]]:
+        """Repository count per snapshot date and ``org`` or ``language``."""
+        if field not in ('org', 'language'):
+            raise ValueError(f"Cannot group snapshots by {field}")
+        return [dict(row) for row in self.connection.execute(
+            f"SELECT snapshot_date, {field}, COUNT(*) AS repositories FROM snapshots "
+            f"GROUP BY snapshot_date, {field} ORDER BY snapshot_date, {field}"
+        )]
+
+    def score_changes(self, days: int = 7, as_of: Optional[DateLike] = None) -> List[Dict[str, Any]]:
+        """Quality score changes between the latest snapshot and the one ``days`` days earlier.
+
+        The earlier snapshot is the most recent one on or before that date.
+        Repositories whose score did not change are left out; new repositories
+        have a ``previous_score`` of None.
+        """
+        current = _date_key(as_of) if as_of else self.latest_date()
+        if current is None:
+            return []
+        previous = self.latest_date(datetime.strptime(current, '%Y-%m-%d') - timedelta(days=days))
+        rows = self.connection.execute(
+            """
+            SELECT now.repo_id, now.full_name, now.org,
+                   earlier.quality_score AS previous_score,
+                   now.quality_score AS current_score,
+                   now.quality_score - earlier.quality_score AS change
+            FROM snapshots AS now
+            LEFT JOIN snapshots AS earlier
+                ON earlier.repo_id = now.repo_id AND earlier.snapshot_date = ?
+            WHERE now.snapshot_date = ?
+              AND earlier.quality_score IS NOT now.quality_score
+            ORDER BY ABS(COALESCE(change, 0)) DESC, now.full_name
+            """,
+            (previous, current)
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Tag Matcher
+Compiled keyword matching for tag generation, built from scripts/tag_rules.json
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_rules.json')
+
+# Characters that make up a token; anything else (spaces, punctuation, '-', '_') is a boundary
+_TOKEN_CHARS = 'a-z0-9&#+'
+_TOKEN = re.compile(f'[{_TOKEN_CHARS}]+')
+
+# Only these may separate the words of a multi-word keyword ('mental-health', 'mental_health')
+_SEPARATOR = re.compile(r'[\s_\-]+')
+
+def normalize_text(text: str) -> str:
+    """Lowercase text, splitting camelCase so 'ClinicalDashboard' and 'NHSDashboard' read as two words."""
+    text = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', text or '')
+    return re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text).lower()
+
+class KeywordMatcher:
+    """Finds every keyword in a text in one pass over its tokens.
+
+    Keywords are stored in a trie of words. The text is split into tokens
+    and the trie is walked from each token, so every keyword that matches
+    is reported, including overlapping ones: 'mental health services app'
+    yields 'mental health services', 'mental health' and 'health'.
+
+    Keywords only match at token boundaries, so 'ed' does not match inside
+    'shared' and 'ai' not inside 'maintain'. Spaces in a keyword match any
+    run of spaces, hyphens or underscores ('mental health' matches
+    'mental-health'). With ``prefix=True`` the last word of a keyword may
+    be the start of a longer token ('forecast' matches 'forecasting').
+    """
+
+    def __init__(self, keywords: Iterable[str], prefix: bool = False):
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords))
+        self.prefix = prefix
+        # word -> [child trie, keywords ending at this word]
+        self._trie: Dict[str, list] = {}
+        self._longest_word = 0
+        for keyword in self.keywords:
+            node = self._trie
+            words = _SEPARATOR.split(keyword.strip())
+            self._longest_word = max(self._longest_word, *(len(word) for word in words))
+            for position, word in enumerate(words):
+                entry = node.setdefault(word, [{}, []])
+                if position == len(words) - 1:
+                    entry[1].append(keyword)
+                node = entry[0]
+
+    def _ending(self, node: Dict[str, list], token: str) -> List[str]:
+        """Keywords whose last word matches ``token`` at this trie node, longest word first."""
+        if not self.prefix:
+            entry = node.get(token)
+            return entry[1] if entry else []
+        found = []
+        for length in range(min(len(token), self._longest_word), 0, -1):
+            entry = node.get(token[:length])
+            if entry:
+                found.extend(entry[1])
+        return found
+
+    def find(self, text: str) -> List[str]:
+        """Keywords found in ``text``, once each, by position (longest first where several start together)."""
+        if not self.keywords:
+            return []
+        normalized = normalize_text(text)
+        tokens = [(match.group(0), match.start(), match.end()) for match in _TOKEN.finditer(normalized)]
+        found: Dict[str, None] = {}
+        for first in range(len(tokens)):
+            matches = []
+            node = self._trie
+            for index in range(first, len(tokens)):
+                token, start, _ = tokens[index]
+                if index > first and not _SEPARATOR.fullmatch(normalized, tokens[index - 1][2], start):
+                    break
+                matches = self._ending(node, token) + matches
+                entry = node.get(token)
+                if not entry or not entry[0]:
+                    break
+                node = entry[0]
+            found.update(dict.fromkeys(matches))
+        return list(found)
+
+@lru_cache(maxsize=None)
+def load_tag_rules(rules_file: str = DEFAULT_RULES_FILE) -> Dict[str, Any]:
+    """Load the declarative keyword/tag rules (read once per process)."""
+    with open(rules_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def repository_tag_matcher(rules_file: str = DEFAULT_RULES_FILE) -> KeywordMatcher:
+    """Matcher for the keyword -> tags rules used by ``generate_ai_tags``."""
+    section = load_tag_rules(rules_file)['repository_tags']
+    return KeywordMatcher(section['rules'], prefix=section.get('match') == 'prefix')
+
+@lru_cache(maxsize=None)
+def description_keyword_matcher(rules_file: str = DEFAULT_RULES_FILE) -> KeywordMatcher:
+    """Matcher for the description keywords used by ``generate_tags_from_description``."""
+    section = load_tag_rules(rules_file)['description_keywords']
+    keywords = [keyword for group in section['groups'].values() for keyword in group]
+    return KeywordMatcher(keywords, prefix=section.get('match') == 'prefix')
+
+def repository_tags(text: str, rules_file: str = DEFAULT_RULES_FILE) -> List[str]:
+    """Tags of every repository rule whose keyword appears in ``text``, in rule order."""
+    section = load_tag_rules(rules_file)['repository_tags']
+    limit = section.get('max_tags_per_rule')
+    matched = set(repository_tag_matcher(rules_file).find(text))
+    tags: Dict[str, None] = {}
+    for keyword, rule_tags in section['rules'].items():
+        if keyword in matched:
+            tags.update(dict.fromkeys(rule_tags[:limit]))
+    return list(tags)
+
+def language_tags(language: str, rules_file: str = DEFAULT_RULES_FILE) -> List[str]:
+    """Technology tags for a primary language."""
+    return list(load_tag_rules(rules_file)['language_tags'].get((language or '').lower(), []))
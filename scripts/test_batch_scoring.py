@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Batch Scoring Tests
+Run with: python -m pytest scripts/test_batch_scoring.py
+"""
+
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from batch_scoring import score_repositories
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+def pushed_at_values():
+    """Push times on both sides of every activity threshold, in the formats the API and cache use."""
+    values = [None, '', 'not-a-date']
+    for days in (-2, 0, 29, 30, 59, 60, 89, 90, 364, 365, 400):
+        pushed = NOW - timedelta(days=days, hours=1)
+        values += [pushed.strftime('%Y-%m-%dT%H:%M:%SZ'), pushed.strftime('%Y-%m-%dT%H:%M:%S+01:00')]
+    return values
+
+@pytest.fixture(scope='module')
+def repositories():
+    """Every boundary of each scoring rule, plus a random sample of combinations."""
+    boundaries = {
+        'stargazers_count': [0, 1, 6, 7, 100],
+        'description': [None, '', 'x' * 20, 'x' * 21, 'x' * 50, 'x' * 51],
+        'size': [0, 100, 101, 1000, 1001],
+        'has_readme': [True, False, None],
+        'language': [None, 'Python'],
+        'topics': [[], ['nhs']],
+        'license': [None, {'key': 'mit'}]
+    }
+    pushed = pushed_at_values()
+    repos = [{'pushed_at': value, 'stargazers_count': stars}
+             for value, stars in itertools.product(pushed, boundaries['stargazers_count'])]
+
+    rng = random.Random(0)
+    for _ in range(3000):
+        repo = {field: rng.choice(values) for field, values in boundaries.items()}
+        repo['pushed_at'] = rng.choice(pushed)
+        repos.append(repo)
+    return repos
+
+@pytest.fixture(scope='module')
+def fetcher(tmp_path_factory):
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(tmp_path_factory.mktemp('fetcher'))
+    monkeypatch.setenv('solutions_exchange_secret', 'test-token')
+    from update_repositories import NHSWalesRepositoryFetcher
+    yield NHSWalesRepositoryFetcher(snapshot_db=None, check_readme=False)
+    monkeypatch.undo()
+
+def test_batch_scores_match_per_repository_scorer(fetcher, repositories):
+    scores, featured = score_repositories(repositories, NOW)
+    expected_scores = [fetcher.calculate_quality_score(repo, NOW) for repo in repositories]
+    expected_featured = [fetcher.determine_featured_status(repo, score, NOW)
+                         for repo, score in zip(repositories, expected_scores)]
+    assert scores == expected_scores
+    assert featured == expected_featured
+
+def test_fetcher_uses_batch_scorer_above_threshold(fetcher, repositories, monkeypatch):
+    import update_repositories
+    per_repository = fetcher.score_repositories(repositories, NOW)
+    monkeypatch.setattr(update_repositories, 'BATCH_SCORING_MIN', 1)
+    assert fetcher.score_repositories(repositories, NOW) == per_repository
+
+def test_empty_batch():
+    assert score_repositories([], NOW) == ([], [])
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Tag Matcher Tests
+Run with: python -m pytest scripts/test_tag_matcher.py
+"""
+
+from tag_matcher import KeywordMatcher, normalize_text, description_keyword_matcher
+
+def test_overlapping_keywords_are_all_reported():
+    matcher = KeywordMatcher(['mental health services', 'mental health', 'health', 'public health'])
+    assert matcher.find("Mental health services app") == ['mental health services', 'mental health', 'health']
+    assert matcher.find("public health data pipeline") == ['public health', 'health']
+
+def test_separators_between_keyword_words():
+    matcher = KeywordMatcher(['mental health'])
+    assert matcher.find("mental-health_tracker") == ['mental health']
+    assert matcher.find("mental, health") == []
+
+def test_keywords_match_at_token_boundaries_only():
+    matcher = KeywordMatcher(['ed', 'ai', 'a&e'])
+    assert matcher.find("shared maintainer tooling") == []
+    assert matcher.find("AI triage for A&E and ED") == ['ai', 'a&e', 'ed']
+
+def test_prefix_matching():
+    matcher = KeywordMatcher(['forecast', 'mental health'], prefix=True)
+    assert matcher.find("Forecasting mental healthcare") == ['forecast', 'mental health']
+    assert KeywordMatcher(['forecast']).find("Forecasting") == []
+
+def test_camel_case_and_acronyms_are_split():
+    assert normalize_text("ClinicalDashboard") == 'clinical dashboard'
+    assert normalize_text("NHSDashboard") == 'nhs dashboard'
+    matcher = KeywordMatcher(['nhs', 'dashboard'])
+    assert matcher.find("NHSDashboard") == ['nhs', 'dashboard']
+
+def test_description_keywords_from_rules():
+    found = description_keyword_matcher().find("Mental health services app")
+    assert {'mental health', 'health'} <= set(found)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+NHS Wales Solutions Exchange - Traffic Store
+Durable per-day clone and view history beyond GitHub's 14-day traffic window
+"""
+
+import json
+import os
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Any, Iterable, Optional
+
+from history_export import month_of, history_months, read_history, write_history
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRAFFIC_DB = os.getenv('SOLUTIONS_EXCHANGE_TRAFFIC_DB', 'data/traffic.sqlite')
+DEFAULT_TRAFFIC_HISTORY_DIR = os.getenv('SOLUTIONS_EXCHANGE_TRAFFIC_HISTORY', 'data/history/traffic')
+TRAFFIC_KINDS = ('clones', 'views')
+ROLLUP_WINDOWS = (30, 90, 365)
+
+# Days of traffic the GitHub API returns; older buckets no longer change
+TRAFFIC_API_DAYS = 14
+
+# Fields of each bucket in the history export, after its day
+TRAFFIC_HISTORY_COLUMNS = ['repo', 'org', 'kind', 'count', 'uniques']
+
+# One row per repository, kind and day; org_daily is kept in step by triggers so
+# per-organization rollups never read the per-repository history
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traffic (
+    repo TEXT NOT NULL,
+    org TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    uniques INTEGER NOT NULL,
+    PRIMARY KEY (repo, kind, day)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS traffic_kind_day ON traffic (kind, day, repo, count, uniques);
+
+CREATE TABLE IF NOT EXISTS org_daily (
+    org TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    uniques INTEGER NOT NULL,
+    PRIMARY KEY (kind, day, org)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS traffic_insert AFTER INSERT ON traffic
+BEGIN
+    INSERT INTO org_daily (org, kind, day, count, uniques)
+    VALUES (NEW.org, NEW.kind, NEW.day, NEW.count, NEW.uniques)
+    ON CONFLICT (kind, day, org) DO UPDATE SET
+        count = count + excluded.count,
+        uniques = uniques + excluded.uniques;
+END;
+
+CREATE TRIGGER IF NOT EXISTS traffic_update AFTER UPDATE ON traffic
+BEGIN
+    UPDATE org_daily
+    SET count = count + NEW.count - OLD.count,
+        uniques = uniques + NEW.uniques - OLD.uniques
+    WHERE org = NEW.org AND kind = NEW.kind AND day = NEW.day;
+END;
+"""
+
+def bucket_day(timestamp: str) -> str:
+    """Day (YYYY-MM-DD) of a GitHub traffic bucket timestamp."""
+    return timestamp[:10]
+
+class TrafficStore:
+    """SQLite store of the daily clone and view buckets returned by the traffic API.
+
+    Buckets are keyed by (repository, kind, day). Re-ingesting a day that is
+    already stored replaces its counts, since GitHub reports the current day
+    as a partial bucket that grows until the day ends; nothing is deleted, so
+    history accumulates beyond the 14 days the API returns.
+
+    The database itself is only cached between runs. ``export_history``
+    writes the buckets with any traffic to committed monthly files and
+    ``restore_history`` loads them back into a database that lost them.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_TRAFFIC_DB):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def ingest(self, owner: str, name: str, kind: str, buckets: Iterable[Dict[str, Any]]) -> int:
+        """Store the per-day ``buckets`` of one repository; returns rows inserted or changed."""
+        if kind not in TRAFFIC_KINDS:
+            raise ValueError(f"Unknown traffic kind: {kind}")
+
+        rows = [
+            (f'{owner}/{name}', owner, kind, bucket_day(bucket['timestamp']),
+             bucket.get('count', 0), bucket.get('uniques', 0))
+            for bucket in buckets if bucket.get('timestamp')
+        ]
+        with self.connection:
+            cursor = self.connection.executemany(
+                """
+                INSERT INTO traffic (repo, org, kind, day, count, uniques)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (repo, kind, day) DO UPDATE SET
+                    count = excluded.count,
+                    uniques = excluded.uniques
+                WHERE count != excluded.count OR uniques != excluded.uniques
+                """,
+                rows
+            )
+        return max(cursor.rowcount, 0)
+
+    def export_history(self, history_dir: str = DEFAULT_TRAFFIC_HISTORY_DIR,
+                       since: Optional[str] = None) -> int:
+        """Write the monthly history files for months from ``since`` (default all) and any not exported yet.
+
+        Each line is one day's buckets with clones or views; all-zero buckets
+        are left out. Returns the number of months written.
+        """
+        exported = set(history_months(history_dir))
+        months = [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT substr(day, 1, 7) FROM traffic ORDER BY 1"
+        )]
+        months = [month for month in months if month not in exported or month >= month_of(since or '')]
+
+        for month in months:
+            rows = self.connection.execute(
+                "SELECT day, repo, org, kind, count, uniques FROM traffic "
+                "WHERE substr(day, 1, 7) = ? AND (count > 0 OR uniques > 0) ORDER BY day, repo, kind",
+                (month,)
+            )
+            write_history(history_dir, month, (
+                {'day': day, 'columns': TRAFFIC_HISTORY_COLUMNS, 'rows': [list(row[1:]) for row in day_rows]}
+                for day, day_rows in groupby(rows, key=lambda row: row[0])
+            ))
+        return len(months)
+
+    def restore_history(self, history_dir: str = DEFAULT_TRAFFIC_HISTORY_DIR) -> int:
+        """Load exported buckets for months the database holds fewer of; returns rows restored.
+
+        Exported buckets are final apart from the last ``TRAFFIC_API_DAYS``,
+        which the next ingest refreshes, so they overwrite stored values.
+        """
+        restored = 0
+        for month in history_months(history_dir):
+            records = list(read_history(history_dir, month))
+            stored = self.connection.execute(
+                "SELECT COUNT(*) FROM traffic WHERE substr(day, 1, 7) = ? AND (count > 0 OR uniques > 0)",
+                (month,)
+            ).fetchone()[0]
+            if stored >= sum(len(record['rows']) for record in records):
+                continue
+
+            rows = []
+            for record in records:
+                index = {column: position for position, column in enumerate(record['columns'])}
+                rows.extend(
+                    (row[index['repo']], row[index['org']], row[index['kind']], record['day'],
+                     row[index['count']], row[index['uniques']])
+                    for row in record['rows']
+                )
+            with self.connection:
+                cursor = self.connection.executemany(
+                    """
+                    INSERT INTO traffic (repo, org, kind, day, count, uniques)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (repo, kind, day) DO UPDATE SET
+                        count = excluded.count,
+                        uniques = excluded.uniques
+                    WHERE count != excluded.count OR uniques != excluded.uniques
+                    """,
+                    rows
+                )
+            restored += max(cursor.rowcount, 0)
+
+        if restored:
+            logger.warning(f"Traffic database was missing history; restored {restored} daily buckets "
+                           f"from {history_dir}")
+        return restored
+
+    @staticmethod
+    def window_start(days: int, now: Optional[datetime] = None) -> str:
+        """First day included in a window of ``days`` days ending today."""
+        now = now or datetime.now()
+        return (now - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    def rollup(self, days: int, now: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """Total clones and views over the last ``days`` days.
+
+        ``uniques`` is the sum of daily unique counts, since GitHub does not
+        report unique visitors over longer periods.
+        """
+        rows = self.connection.execute(
+            "SELECT kind, SUM(count), SUM(uniques) FROM org_daily WHERE day >= ? GROUP BY kind",
+            (self.window_start(days, now),)
+        ).fetchall()
+        totals = {kind: {'count': 0, 'uniques': 0} for kind in TRAFFIC_KINDS}
+        for kind, count, uniques in rows:
+            totals[kind] = {'count': count, 'uniques': uniques}
+        return totals
+
+    def rollup_by_org(self, days: int, now: Optional[datetime] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Clones and views per organization over the last ``days`` days."""
+        rows = self.connection.execute(
+            "SELECT org, kind, SUM(count), SUM(uniques) FROM org_daily WHERE day >= ? "
+            "GROUP BY org, kind ORDER BY org",
+            (self.window_start(days, now),)
+        ).fetchall()
+        return self._nest(rows)
+
+    def rollup_by_repo(self, days: int, now: Optional[datetime] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Clones and views per repository over the last ``days`` days."""
+        rows = self.connection.execute(
+            "SELECT repo, kind, SUM(count), SUM(uniques) FROM traffic "
+            "WHERE kind IN ('clones', 'views') AND day >= ? GROUP BY repo, kind ORDER BY repo",
+            (self.window_start(days, now),)
+        ).fetchall()
+        return self._nest(rows)
+
+    @staticmethod
+    def _nest(rows: List[tuple]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        nested: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for key, kind, count, uniques in rows:
+            totals = nested.setdefault(key, {k: {'count': 0, 'uniques': 0} for k in TRAFFIC_KINDS})
+            totals[kind] = {'count': count, 'uniques': uniques}
+        return nested
+
+    def history_range(self) -> Dict[str, Optional[str]]:
+        """First and last stored day."""
+        first, last = self.connection.execute("SELECT MIN(day), MAX(day) FROM org_daily").fetchone()
+        return {'first_day': first, 'last_day': last}
+
+    def export_rollups(self, output_file: str = 'data/traffic_rollups.json',
+                       windows: Iterable[int] = ROLLUP_WINDOWS, now: Optional[datetime] = None) -> bool:
+        """Write windowed totals, per organization and per repository, for the service-metrics page."""
+        try:
+            rollups = {
+                **self.history_range(),
+                'windows': {
+                    str(days): {
+                        'total': self.rollup(days, now),
+                        'organizations': self.rollup_by_org(days, now),
+                        'repositories': self.rollup_by_repo(days, now)
+                    }
+                    for days in windows
+                }
+            }
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(rollups, f, indent=2)
+            logger.info(f"Traffic rollups exported to {output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to export traffic rollups: {e}")
+            return False
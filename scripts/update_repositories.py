@@ -8,10 +8,26 @@ import requests
 import json
 import os
 import sys
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
 import random
+import threading
+
+from github_client import GitHubClient, GITHUB_API_URL
+from graphql_engine import GitHubGraphQLEngine
+from http_cache import HTTPCache
+from pipeline_metrics import PipelineMetrics
+from profiling import StageProfiler, add_profile_arguments, profiler_from_args
+from readme_probe import ReadmeProbe, README_FIELDS
+from tag_matcher import repository_tags, language_tags
+from snapshot_store import SnapshotStore, DEFAULT_SNAPSHOT_DB, DEFAULT_SNAPSHOT_HISTORY_DIR
+from utils import iter_repositories, save_repositories_streaming, RepositorySpool
+from utils import export_published_repositories, export_api_shards, export_facet_index, export_search_index
+from utils import load_run_metadata, update_run_metadata, build_change_report, export_change_report
 
 # Configure logging
 logging.basicConfig(
@@ -24,10 +40,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Day thresholds on time since last push used by the quality score (30/90/365)
+# and featured status (60); crossing one changes the score without any upstream change
+ACTIVITY_THRESHOLDS = (30, 60, 90, 365)
+
+# Upstream fields that feed tag generation, scoring and featured status
+ENHANCEMENT_INPUT_FIELDS = [
+    'pushed_at', 'updated_at', 'topics', 'description',
+    'name', 'language', 'stargazers_count', 'size', 'license', 'has_readme', 'private'
+]
+
+# Smallest batch scored with pandas; below this the per-repository scorer is faster (pandas
+# costs ~2.4 ms per call and ~0.36 s to import, and only breaks even at ~3,000 repositories per batch)
+BATCH_SCORING_MIN = 5000
+
+# Section of data/run_metadata.json written by this script
+RUN_METADATA_SECTION = 'update_repositories'
+
+# Fields added by enhance_repository_data
+ENHANCEMENT_FIELDS = ['generated_tags', 'all_tags', 'quality_score', 'featured', 'visibility']
+
+# Fields kept from the previous snapshot in incremental mode: what needs_enhancement
+# compares and what an unchanged repository carries over
+PREVIOUS_SNAPSHOT_FIELDS = sorted(set(ENHANCEMENT_INPUT_FIELDS) | set(ENHANCEMENT_FIELDS) | set(README_FIELDS))
+
 class NHSWalesRepositoryFetcher:
     """Fetches and enhances NHS Wales repository data for the Solutions Exchange."""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, use_cache: bool = True, use_graphql: bool = False,
+                 incremental: bool = False, snapshot_db: Optional[str] = DEFAULT_SNAPSHOT_DB,
+                 snapshot_history_dir: str = DEFAULT_SNAPSHOT_HISTORY_DIR,
+                 check_readme: bool = True, profiler: Optional[StageProfiler] = None):
         self.github_token = os.getenv('solutions_exchange_secret')
         if not self.github_token:
             logger.error("GitHub token not found. Set solutions_exchange_secret environment variable.")
@@ -43,12 +86,6 @@ class NHSWalesRepositoryFetcher:
             token_type = "Fine-grained Personal Access Token (github_pat_)"
         
         logger.info(f"Using token type: {token_type}")
-            
-        self.headers = {
-            'Authorization': f'token {self.github_token}',
-            'Accept': 'application/vnd.github.v3+json',
-            'User-Agent': 'NHS-Wales-Solutions-Exchange/1.0'
-        }
         
         # NHS Wales organizations - Updated to match working local script
         self.organizations = [
@@ -78,113 +115,120 @@ class NHSWalesRepositoryFetcher:
         ]
         
         self.output_file = 'data/repositories.json'
+        
+        # Worker pool size for the concurrent crawl (1 = sequential)
+        self.max_workers = max(1, max_workers)
+        
+        # Request, retry and stage timings, written to data/pipeline_metrics.json at the end of the run
+        self.profiler = profiler
+        self.metrics = PipelineMetrics(RUN_METADATA_SECTION, profiler=profiler)
+        
+        # Pooled, retrying client; unchanged pages come back from the cache as free 304s
+        self.client = GitHubClient(
+            self.github_token,
+            pool_size=self.max_workers * 2,
+            cache=HTTPCache(enabled=use_cache),
+            metrics=self.metrics
+        )
+        
+        # Optional bulk listing through aliased GraphQL queries
+        self.graphql = GitHubGraphQLEngine(self.client) if use_graphql else None
+        
+        # README presence for REST listings (GraphQL listings include it), cached by pushed_at
+        self.readme_probe = ReadmeProbe(self.client, max_workers=self.max_workers,
+                                        enabled=use_cache) if check_readme else None
+        
+        # Incremental mode: previous snapshot indexed by repo id
+        self.incremental = incremental
+        self.snapshot_db = snapshot_db
+        self.snapshot_history_dir = snapshot_history_dir
+        self.previous_repositories: Dict[int, Dict[str, Any]] = {}
+        
+        # When each repository was last enhanced (by id), stored in the run metadata
+        self.previous_enhanced_at: Dict[str, str] = {}
+        self.enhanced_at: Dict[int, str] = {}
+        self.carried_over = 0
+        self.reenhanced = 0
+        self._counter_lock = threading.Lock()
+        
+        # Reference time shared by all scoring in a run (set by fetch_all_repositories)
+        self.reference_time: Optional[datetime] = None
 
     
-    def fetch_organization_repositories(self, organization: str) -> List[Dict[str, Any]]:
-        """Fetch all repositories for a given organization."""
-        repos = []
-        page = 1
-        
-        logger.info(f"Fetching repositories for organization: {organization}")
+    def fetch_repository_page(self, organization: str, page: int) -> Optional[requests.Response]:
+        """Fetch a single page of an organization's repositories."""
+        api_url = f'{GITHUB_API_URL}/orgs/{organization}/repos'
+        params = {'per_page': 100, 'page': page, 'type': 'all'}
         
-        while True:
-            api_url = f'https://api.github.com/orgs/{organization}/repos'
-            params = {'per_page': 100, 'page': page, 'type': 'all'}
-            
-            try:
-                response = requests.get(api_url, headers=self.headers, params=params, timeout=30)
-                
-                if response.status_code == 404:
-                    logger.warning(f"Organization {organization} not found or not accessible")
-                    break
-                elif response.status_code != 200:
-                    logger.error(f"Error fetching repositories for {organization}: {response.status_code}, {response.text}")
-                    break
-                
-                data = response.json()
-                
-                if not data:
-                    break  # No more data to fetch
-                
-                # Filter repositories by visibility: only "public" or "internal"
-                filtered_repos = [repo for repo in data if repo.get('visibility') in ['public', 'internal']]
-                repos.extend(filtered_repos)
-                
-                logger.debug(f"Page {page}: Found {len(filtered_repos)} public/internal repos out of {len(data)} total")
-                page += 1
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request failed for {organization}: {e}")
-                break
-        
-        logger.info(f"Total repositories for {organization}: {len(repos)}")
-        return repos
+        try:
+            response = self.client.get(api_url, params=params)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed for {organization} (page {page}): {e}")
+            return None
+        
+        if response.status_code == 404:
+            logger.warning(f"Organization {organization} not found or not accessible")
+            return None
+        elif response.status_code != 200:
+            logger.error(f"Error fetching repositories for {organization} (page {page}): {response.status_code}, {response.text}")
+            return None
+        
+        return response
+    
+    @staticmethod
+    def get_last_page(response: requests.Response) -> int:
+        """Read the last page number from the Link header (1 if there is only one page)."""
+        last_url = response.links.get('last', {}).get('url')
+        if not last_url:
+            return 1
+        try:
+            return int(parse_qs(urlparse(last_url).query).get('page', ['1'])[0])
+        except ValueError:
+            return 1
     
     def generate_ai_tags(self, repo: Dict[str, Any]) -> List[str]:
         """Generate AI-like tags based on repository characteristics."""
-        name = repo.get('name', '').lower()
-        description = (repo.get('description') or '').lower()
-        language = repo.get('language', '').lower() if repo.get('language') else ''
         topics = repo.get('topics', [])
         
-        # Healthcare-specific tags
-        healthcare_keywords = {
-            'clinical': ['clinical', 'patient-care', 'medical'],
-            'emergency': ['emergency-department', 'urgent-care', 'triage'],
-            'data': ['data-analytics', 'healthcare-insights', 'reporting'],
-            'integration': ['system-integration', 'interoperability', 'api'],
-            'pharmacy': ['pharmacy', 'prescriptions', 'medications'],
-            'dental': ['dental-services', 'oral-health'],
-            'mental': ['mental-health', 'wellbeing', 'psychology'],
-            'forecast': ['predictive-analytics', 'forecasting', 'ml'],
-            'dashboard': ['visualization', 'monitoring', 'dashboards'],
-            'mobile': ['mobile-health', 'digital-health'],
-            'security': ['information-governance', 'data-security']
-        }
-        
-        # Technology tags based on language
-        tech_tags = {
-            'python': ['python', 'data-science', 'automation'],
-            'javascript': ['javascript', 'web-development', 'frontend'],
-            'typescript': ['typescript', 'modern-web', 'scalable'],
-            'java': ['java', 'enterprise', 'backend'],
-            'c#': ['csharp', 'dotnet', 'microsoft-stack'],
-            'r': ['r', 'statistical-analysis', 'research'],
-            'sql': ['database', 'data-management', 'analytics'],
-            'html': ['web-interface', 'frontend', 'user-experience'],
-            'css': ['styling', 'responsive-design', 'ui'],
-            'shell': ['automation', 'scripting', 'devops'],
-            'dockerfile': ['containerization', 'deployment', 'docker']
-        }
-        
-        generated_tags = set()
+        # Ordered set: tags keep the order they were added in, so the
+        # selection below is the same on every run
+        generated_tags = {}
         
         # Add existing topics
-        generated_tags.update(topics)
+        generated_tags.update(dict.fromkeys(topics))
         
-        # Add healthcare tags based on content
-        for keyword, tags in healthcare_keywords.items():
-            if keyword in name or keyword in description:
-                generated_tags.update(tags[:2])  # Add up to 2 related tags
+        # Add healthcare tags based on content (keyword rules in tag_rules.json)
+        text = f"{repo.get('name', '')}\n{repo.get('description') or ''}"
+        generated_tags.update(dict.fromkeys(repository_tags(text)))
         
         # Add technology tags
-        if language in tech_tags:
-            generated_tags.update(tech_tags[language])
+        generated_tags.update(dict.fromkeys(language_tags(repo.get('language'))))
         
         # Add general NHS tags
-        generated_tags.update(['nhs-wales', 'healthcare'])
+        generated_tags.update(dict.fromkeys(['nhs-wales', 'healthcare']))
         
         # Add quality indicators based on repository characteristics
         if repo.get('stargazers_count', 0) > 0:
-            generated_tags.add('community-validated')
+            generated_tags['community-validated'] = None
         if repo.get('has_readme'):
-            generated_tags.add('well-documented')
+            generated_tags['well-documented'] = None
         if repo.get('size', 0) > 1000:
-            generated_tags.add('comprehensive')
+            generated_tags['comprehensive'] = None
             
         return list(generated_tags)[:8]  # Limit to 8 tags
     
-    def calculate_quality_score(self, repo: Dict[str, Any]) -> int:
+    @staticmethod
+    def days_since_push(repo: Dict[str, Any], now: Optional[datetime] = None) -> Optional[int]:
+        """Whole days between the last push and ``now`` (None if unknown)."""
+        if not repo.get('pushed_at'):
+            return None
+        try:
+            last_push = datetime.fromisoformat(repo['pushed_at'].replace('Z', '+00:00'))
+        except (ValueError, TypeError):
+            return None
+        return ((now or datetime.now()).replace(tzinfo=last_push.tzinfo) - last_push).days
+    
+    def calculate_quality_score(self, repo: Dict[str, Any], now: Optional[datetime] = None) -> int:
         """Calculate a quality score based on repository metrics."""
         score = 50  # Base score
         
@@ -193,18 +237,14 @@ class NHSWalesRepositoryFetcher:
         score += min(stars * 3, 20)
         
         # Recent activity (0-15 points)
-        if repo.get('pushed_at'):
-            try:
-                last_push = datetime.fromisoformat(repo['pushed_at'].replace('Z', '+00:00'))
-                days_since_update = (datetime.now().replace(tzinfo=last_push.tzinfo) - last_push).days
-                if days_since_update < 30:
-                    score += 15
-                elif days_since_update < 90:
-                    score += 10
-                elif days_since_update < 365:
-                    score += 5
-            except (ValueError, TypeError):
-                pass
+        days_since_update = self.days_since_push(repo, now)
+        if days_since_update is not None:
+            if days_since_update < 30:
+                score += 15
+            elif days_since_update < 90:
+                score += 10
+            elif days_since_update < 365:
+                score += 5
         
         # Documentation quality (0-15 points)
         if repo.get('has_readme'):
@@ -234,7 +274,8 @@ class NHSWalesRepositoryFetcher:
         
         return min(max(score, 30), 100)  # Clamp between 30-100
     
-    def determine_featured_status(self, repo: Dict[str, Any], quality_score: int) -> bool:
+    def determine_featured_status(self, repo: Dict[str, Any], quality_score: int,
+                                  now: Optional[datetime] = None) -> bool:
         """Determine if a repository should be featured."""
         # High quality automatic feature
         if quality_score >= 80:
@@ -246,27 +287,18 @@ class NHSWalesRepositoryFetcher:
         
         # Recent activity and good quality
         if quality_score >= 65:
-            try:
-                last_push = datetime.fromisoformat(repo['pushed_at'].replace('Z', '+00:00'))
-                days_since_update = (datetime.now().replace(tzinfo=last_push.tzinfo) - last_push).days
-                if days_since_update < 60:  # Recent activity
-                    return True
-            except (ValueError, TypeError):
-                pass
+            days_since_update = self.days_since_push(repo, now)
+            if days_since_update is not None and days_since_update < 60:  # Recent activity
+                return True
         
         return False
     
-    def enhance_repository_data(self, repo: Dict[str, Any]) -> Dict[str, Any]:
-        """Enhance repository data with AI tags and quality metrics."""
+    def apply_enhancement(self, repo: Dict[str, Any], quality_score: int, featured: bool,
+                          now: datetime) -> Dict[str, Any]:
+        """Add tags and the given score and featured status to a repository."""
         # Generate AI tags
         generated_tags = self.generate_ai_tags(repo)
-        all_tags = list(set(repo.get('topics', []) + generated_tags))
-        
-        # Calculate quality score
-        quality_score = self.calculate_quality_score(repo)
-        
-        # Determine featured status
-        featured = self.determine_featured_status(repo, quality_score)
+        all_tags = list(dict.fromkeys(repo.get('topics', []) + generated_tags))
         
         # Determine visibility status
         visibility = "Internal" if repo.get('private', False) else "Public"
@@ -277,72 +309,334 @@ class NHSWalesRepositoryFetcher:
         repo['quality_score'] = quality_score
         repo['featured'] = featured
         repo['visibility'] = visibility
-        repo['last_updated'] = datetime.now().isoformat()
+        # Kept in the run metadata rather than the data so unchanged repositories serialise identically
+        if 'id' in repo:
+            self.enhanced_at[repo['id']] = now.isoformat()
         
         return repo
     
-    def fetch_all_repositories(self) -> List[Dict[str, Any]]:
-        """Fetch repositories from all NHS Wales organizations."""
-        all_repositories = []
+    def enhance_repository_data(self, repo: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Enhance repository data with AI tags and quality metrics."""
+        now = now or self.reference_time or datetime.now()
         
-        for org in self.organizations:
+        # Calculate quality score
+        quality_score = self.calculate_quality_score(repo, now)
+        
+        # Determine featured status
+        featured = self.determine_featured_status(repo, quality_score, now)
+        
+        return self.apply_enhancement(repo, quality_score, featured, now)
+    
+    def score_repositories(self, repositories: List[Dict[str, Any]],
+                           now: Optional[datetime] = None) -> Tuple[List[int], List[bool]]:
+        """Quality scores and featured flags for many repositories at once.
+        
+        Batches of ``BATCH_SCORING_MIN`` or more are scored with the
+        vectorised pandas scorer; smaller ones (every listing page) call
+        ``calculate_quality_score`` and ``determine_featured_status`` per
+        repository, which gives the same results.
+        """
+        now = now or self.reference_time or datetime.now()
+        if len(repositories) < BATCH_SCORING_MIN:
+            scores = [self.calculate_quality_score(repo, now) for repo in repositories]
+            featured = [self.determine_featured_status(repo, score, now) for repo, score in zip(repositories, scores)]
+            return scores, featured
+        
+        # Imported here so pandas is only loaded for batches large enough to benefit
+        from batch_scoring import score_repositories
+        return score_repositories(repositories, now)
+    
+    def load_previous_snapshot(self) -> None:
+        """Index the previous output file by repository id.
+        
+        The file is streamed and only ``PREVIOUS_SNAPSHOT_FIELDS`` are kept
+        per repository, so the index stays small next to the full records.
+        """
+        self.previous_repositories = {
+            repo['id']: {field: repo[field] for field in PREVIOUS_SNAPSHOT_FIELDS if field in repo}
+            for repo in iter_repositories(self.output_file) if 'id' in repo
+        }
+        self.previous_enhanced_at = load_run_metadata().get(RUN_METADATA_SECTION, {}).get('enhanced_at', {})
+        logger.info(f"Incremental mode: loaded {len(self.previous_repositories)} repositories from previous snapshot")
+    
+    def activity_band(self, pushed_at: Optional[str], reference: datetime) -> Optional[int]:
+        """Return how many activity thresholds the time since the last push has passed."""
+        days_since_update = self.days_since_push({'pushed_at': pushed_at}, reference)
+        if days_since_update is None:
+            return None
+        return sum(1 for threshold in ACTIVITY_THRESHOLDS if days_since_update >= threshold)
+    
+    def needs_enhancement(self, repo: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> bool:
+        """Check whether a repository changed upstream or crossed a time-based score band."""
+        if previous is None or any(field not in previous for field in ENHANCEMENT_FIELDS):
+            return True
+        
+        if any(repo.get(field) != previous.get(field) for field in ENHANCEMENT_INPUT_FIELDS):
+            return True
+        
+        enhanced_at = self.previous_enhanced_at.get(str(repo.get('id')))
+        try:
+            enhanced_at = datetime.fromisoformat(enhanced_at)
+        except (ValueError, TypeError):
+            return True
+        
+        now = self.reference_time or datetime.now()
+        return self.activity_band(repo.get('pushed_at'), enhanced_at) != self.activity_band(repo.get('pushed_at'), now)
+    
+    def enhance_repositories(self, repos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enhance a batch of repositories, scoring them in one vectorised call.
+        
+        In incremental mode, repositories that have not changed keep their
+        previous enhancement instead.
+        """
+        to_enhance = []
+        for repo in repos:
+            previous = self.previous_repositories.get(repo.get('id')) if self.incremental else None
+            if previous is not None and repo.get('has_readme') is None and 'has_readme' in repo:
+                # The README lookup failed: keep the previous result rather than rescoring as "no README"
+                for field in README_FIELDS:
+                    if field in previous:
+                        repo[field] = previous[field]
+            if self.incremental and not self.needs_enhancement(repo, previous):
+                for field in ENHANCEMENT_FIELDS:
+                    repo[field] = previous[field]
+                self.enhanced_at[repo['id']] = self.previous_enhanced_at[str(repo['id'])]
+                with self._counter_lock:
+                    self.carried_over += 1
+            else:
+                to_enhance.append(repo)
+        
+        if to_enhance:
+            now = self.reference_time or datetime.now()
+            with self.metrics.stage('score'):
+                scores, featured = self.score_repositories(to_enhance, now)
+            with self.metrics.stage('enhance'):
+                for repo, quality_score, is_featured in zip(to_enhance, scores, featured):
+                    self.apply_enhancement(repo, quality_score, is_featured, now)
+            with self._counter_lock:
+                self.reenhanced += len(to_enhance)
+        
+        return repos
+    
+    def process_page(self, organization: str, page: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Fetch, filter and enhance one page of an organization's repositories.
+        
+        Returns the enhanced repositories and the organization's last page
+        number, which only page 1 reports (later pages return 1).
+        """
+        try:
+            with self.metrics.stage('fetch'):
+                response = self.fetch_repository_page(organization, page)
+            if response is None:
+                if page > 1:
+                    logger.error(f"Page {page} of {organization} could not be fetched; results are incomplete")
+                return [], 1
+            
+            data = response.json()
+            last_page = self.get_last_page(response) if page == 1 else 1
+            
+            # Filter repositories by visibility: only "public" or "internal"
+            repos = [repo for repo in data if repo.get('visibility') in ['public', 'internal']]
+            logger.debug(f"{organization} page {page}: Found {len(repos)} public/internal repos out of {len(data)} total")
+            
+            if self.readme_probe:
+                with self.metrics.stage('readme'):
+                    self.readme_probe.apply(repos)
+            return self.enhance_repositories(repos), last_page
+        except Exception as e:
+            logger.error(f"Failed to process page {page} of {organization}: {e}")
+            return [], 1
+    
+    def stream_repository_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield each page of enhanced repositories as soon as it is ready.
+        
+        Page 1 of every organization is queued up front; when it arrives the
+        organization's remaining pages are queued behind it. Workers fetch
+        and enhance pages, so enhancing one page overlaps with downloading
+        the next ones. Pages are yielded in completion order.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            remaining = {}
+            totals = {}
+            for org in self.organizations:
+                logger.info(f"Fetching repositories for organization: {org}")
+                pending[executor.submit(self.process_page, org, 1)] = (org, 1)
+                remaining[org] = 1
+                totals[org] = 0
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    org, page = pending.pop(future)
+                    repos, last_page = future.result()
+                    for next_page in range(2, last_page + 1):
+                        pending[executor.submit(self.process_page, org, next_page)] = (org, next_page)
+                    remaining[org] += last_page - 2  # pages just queued, less this one
+                    totals[org] += len(repos)
+                    if not remaining[org]:
+                        logger.info(f"Total repositories for {org}: {totals[org]}")
+                    yield repos
+    
+    def fetch_all_repositories(self, spool: RepositorySpool) -> int:
+        """Fetch repositories from all NHS Wales organizations into ``spool``.
+        
+        Pages stream from the worker pool already enhanced and are added to
+        the spool as they arrive; the spool sorts them into the published
+        order. Returns the number of repositories spooled.
+        """
+        featured_count = 0
+        quality_total = 0
+        
+        # One reference time for every score in the run
+        self.reference_time = datetime.now()
+        
+        if self.incremental:
+            self.load_previous_snapshot()
+        
+        repos_by_org = None
+        if self.graphql:
             try:
-                repos = self.fetch_organization_repositories(org)
-                for repo in repos:
-                    enhanced_repo = self.enhance_repository_data(repo)
-                    all_repositories.append(enhanced_repo)
-            except Exception as e:
-                logger.error(f"Failed to process organization {org}: {e}")
-                continue
+                with self.metrics.stage('fetch'):
+                    repos_by_org = self.graphql.fetch_organizations(self.organizations)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"GraphQL listing failed, falling back to REST: {e}")
         
-        # Sort by quality score and last updated
-        all_repositories.sort(key=lambda x: (x.get('quality_score', 0), x.get('updated_at', '')), reverse=True)
+        if repos_by_org is not None:
+            pages = self.enhance_graphql_listings(repos_by_org)
+        else:
+            pages = self.stream_repository_pages()
         
-        logger.info(f"Total repositories fetched and enhanced: {len(all_repositories)}")
+        for repos in pages:
+            with self.metrics.stage('spool'):
+                spool.extend(repos)
+            featured_count += sum(1 for repo in repos if repo.get('featured'))
+            quality_total += sum(repo.get('quality_score', 0) for repo in repos)
         
-        # Log statistics
-        featured_count = sum(1 for repo in all_repositories if repo.get('featured'))
-        avg_quality = sum(repo.get('quality_score', 0) for repo in all_repositories) / len(all_repositories) if all_repositories else 0
+        logger.info(f"Total repositories fetched and enhanced: {spool.count}")
+        if self.incremental:
+            logger.info(f"Incremental mode: {self.reenhanced} re-enhanced, {self.carried_over} carried over unchanged")
         
+        # Log statistics
+        avg_quality = quality_total / spool.count if spool.count else 0
         logger.info(f"Featured repositories: {featured_count}")
         logger.info(f"Average quality score: {avg_quality:.1f}")
         
-        return all_repositories
+        return spool.count
+    
+    def enhance_graphql_listings(self, repos_by_org: Dict[str, List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+        """Yield each organization's GraphQL listing, filtered and enhanced."""
+        for org in self.organizations:
+            # Filter repositories by visibility: only "public" or "internal"
+            repos = [repo for repo in repos_by_org.pop(org, []) if repo.get('visibility') in ['public', 'internal']]
+            logger.info(f"Total repositories for {org}: {len(repos)}")
+            yield self.enhance_repositories(repos)
     
-    def save_repositories(self, repositories: List[Dict[str, Any]]) -> None:
+    def save_repositories(self, repositories: Iterable[Dict[str, Any]]) -> None:
         """Save repositories to JSON file."""
-        # Ensure data directory exists
-        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
-        
-        # Save with pretty formatting
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(repositories, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"Saved {len(repositories)} repositories to {self.output_file}")
+        # Written record by record (same pretty formatting) and moved into place atomically
+        save_repositories_streaming(repositories, self.output_file)
+    
+    def save_run_metadata(self, count: int, changes: Dict[str, Any]) -> bool:
+        """Record the run time, change counts and per-repository enhancement times."""
+        return update_run_metadata(RUN_METADATA_SECTION, {
+            'generated_at': (self.reference_time or datetime.now()).isoformat(),
+            'repositories': count,
+            'changes': {
+                'added': len(changes['added']),
+                'removed': len(changes['removed']),
+                'changed': len(changes['changed']),
+                'unchanged': changes['unchanged']
+            },
+            'enhanced_at': {str(repo_id): enhanced_at for repo_id, enhanced_at in self.enhanced_at.items()}
+        })
     
+    def record_snapshot(self, repositories: Iterable[Dict[str, Any]]) -> bool:
+        """Add this run's repositories to the historical snapshot store."""
+        if not self.snapshot_db:
+            return False
+        try:
+            with SnapshotStore(self.snapshot_db) as store:
+                # The database is only cached; the committed export is the durable copy
+                store.restore_history(self.snapshot_history_dir)
+                store.record_snapshot(repositories, self.reference_time)
+                store.export_history(self.snapshot_history_dir, since=self.reference_time)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record snapshot in {self.snapshot_db}: {e}")
+            return False
+
     def run(self) -> bool:
         """Main execution method."""
         try:
             logger.info("Starting NHS Wales Solutions Exchange data update")
             logger.info(f"Fetching from {len(self.organizations)} organizations")
             
-            repositories = self.fetch_all_repositories()
-            
-            if not repositories:
-                logger.warning("No repositories fetched!")
-                return False
-            
-            self.save_repositories(repositories)
+            with RepositorySpool() as spool:
+                count = self.fetch_all_repositories(spool)
+                self.client.log_stats()
+                if self.readme_probe:
+                    self.readme_probe.log_stats()
+                    self.readme_probe.save()
+                
+                if not count:
+                    logger.warning("No repositories fetched!")
+                    return False
+                
+                # Every step below streams the spool (an external merge of its on-disk runs)
+                # instead of holding the repositories in a list
+                with self.metrics.stage('save'):
+                    # Compared before the save replaces the previous output file
+                    changes = build_change_report(iter_repositories(self.output_file), spool.merged())
+                    self.save_repositories(spool.merged())
+                    export_change_report(changes)
+                    self.save_run_metadata(count, changes)
+                    export_published_repositories(spool.merged(), raw_file=self.output_file)
+                    export_api_shards(spool.merged())
+                    export_facet_index(spool.merged())
+                    export_search_index(spool.merged())
+                    self.record_snapshot(spool.merged())
             logger.info("Data update completed successfully")
             return True
             
         except Exception as e:
             logger.error(f"Fatal error during data update: {e}")
             return False
+        finally:
+            self.metrics.export(self.client)
+            if self.profiler:
+                self.profiler.write()
+            self.client.close()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Fetch and enhance NHS Wales repository data")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Number of concurrent requests (default: 8, use 1 for a sequential crawl)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Bypass the on-disk HTTP cache and fetch every page in full")
+    parser.add_argument('--graphql', action='store_true',
+                        help="List repositories with batched GraphQL queries (includes README presence)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-enhance repositories that changed since the previous snapshot")
+    parser.add_argument('--no-readme', action='store_true',
+                        help="Skip the README lookup for REST listings")
+    parser.add_argument('--snapshot-db', default=DEFAULT_SNAPSHOT_DB,
+                        help=f"SQLite store the run is recorded in (default: {DEFAULT_SNAPSHOT_DB}, '' to disable)")
+    parser.add_argument('--snapshot-history-dir', default=DEFAULT_SNAPSHOT_HISTORY_DIR,
+                        help=f"Committed monthly export of the snapshot store (default: {DEFAULT_SNAPSHOT_HISTORY_DIR})")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
 
 def main():
     """Main entry point."""
-    fetcher = NHSWalesRepositoryFetcher()
+    args = parse_args()
+    fetcher = NHSWalesRepositoryFetcher(max_workers=args.workers, use_cache=not args.no_cache,
+                                        use_graphql=args.graphql, incremental=args.incremental,
+                                        snapshot_db=args.snapshot_db,
+                                        snapshot_history_dir=args.snapshot_history_dir,
+                                        check_readme=not args.no_readme,
+                                        profiler=profiler_from_args(args, RUN_METADATA_SECTION))
     success = fetcher.run()
     sys.exit(0 if success else 1)
 
@@ -4,14 +4,45 @@ NHS Wales Solutions Exchange - Utilities
 Common functions and utilities for data processing
 """
 
+import bisect
+import hashlib
+import heapq
 import json
+import math
 import os
+import re
+import glob
+import shutil
+import tempfile
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Fields read by the web pages; nested objects list the sub-fields kept
+PUBLISHED_FIELDS = {
+    'id': None,
+    'name': None,
+    'description': None,
+    'html_url': None,
+    'language': None,
+    'topics': None,
+    'generated_tags': None,
+    'all_tags': None,
+    'private': None,
+    'owner': ['login'],
+    'license': ['name'],
+    'created_at': None,
+    'updated_at': None,
+    'pushed_at': None,
+    'stargazers_count': None,
+    'forks_count': None,
+    'open_issues_count': None,
+    'quality_score': None,
+    'featured': None
+}
+
 def load_repositories(file_path: str = 'data/repositories.json') -> List[Dict[str, Any]]:
     """Load repository data from JSON file."""
     try:
@@ -39,95 +70,762 @@ def save_repositories(repositories: List[Dict[str, Any]], file_path: str = 'data
         logger.error(f"Failed to save repositories: {e}")
         return False
 
-def get_repository_stats(repositories: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Calculate statistics about the repository collection."""
-    if not repositories:
-        return {}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def iter_repositories(file_path: str = 'data/repositories.json',
+                      chunk_size: int = STREAM_CHUNK_SIZE,
+                      strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield repositories one at a time from a JSON array or JSON Lines file.
     
-    total_repos = len(repositories)
-    featured_repos = sum(1 for repo in repositories if repo.get('featured'))
+    Only the current record (plus one read chunk) is held in memory, so
+    processing can start before the whole file has been read. Invalid JSON
+    is logged and ends the stream; with ``strict`` the ``json.JSONDecodeError``
+    is raised after the records before it were yielded.
+    """
+    decoder = json.JSONDecoder()
     
-    # Language distribution
-    languages = {}
-    for repo in repositories:
-        lang = repo.get('language')
-        if lang:
-            languages[lang] = languages.get(lang, 0) + 1
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            buffer = ''
+            position = 0
+            eof = False
+            is_array = None
+            
+            while True:
+                # Skip whitespace and separators between records
+                while True:
+                    while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                        position += 1
+                    if position < len(buffer) or eof:
+                        break
+                    buffer, position = f.read(chunk_size), 0
+                    eof = not buffer
+                
+                if position >= len(buffer):
+                    if is_array:
+                        logger.error(f"Invalid JSON in {file_path}: unterminated array")
+                        if strict:
+                            raise json.JSONDecodeError("Unterminated array", buffer, position)
+                    return
+                
+                if is_array is None:
+                    is_array = buffer[position] == '['
+                    if is_array:
+                        position += 1
+                    continue
+                
+                if is_array and buffer[position] == ']':
+                    return
+                
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    complete = end < len(buffer) or eof
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    complete = False
+                
+                if not complete:
+                    # Record spans the chunk boundary: read more and retry
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer, position = buffer[position:] + chunk, 0
+                    continue
+                
+                yield record
+                buffer, position = buffer[end:], 0
+    except FileNotFoundError:
+        logger.warning(f"Repository file not found: {file_path}")
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in {file_path}: {e}")
+        if strict:
+            raise
+
+class RepositoryWriter:
+    """Incrementally write repositories to a JSON array or JSON Lines file.
     
-    # Organization distribution
-    organizations = {}
-    for repo in repositories:
-        org = repo.get('owner', {}).get('login')
-        if org:
-            organizations[org] = organizations.get(org, 0) + 1
+    Records are written as they arrive; with ``indent=2`` the output is
+    byte-identical to ``json.dump(repositories, f, indent=2, sort_keys=sort_keys)``.
+    The file is written to a temporary path and moved into place on a clean exit.
+    
+    Usage::
+    
+        with RepositoryWriter('data/repositories.json') as writer:
+            for repo in repositories:
+                writer.write(repo)
+    """
+    
+    def __init__(self, file_path: str, indent: Optional[int] = 2, sort_keys: bool = False):
+        self.file_path = file_path
+        self.indent = indent
+        self.sort_keys = sort_keys
+        self.json_lines = file_path.endswith('.jsonl')
+        self.count = 0
+        self._tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        self._file = None
+    
+    def __enter__(self) -> 'RepositoryWriter':
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        if not self.json_lines:
+            self._file.write('[')
+        return self
+    
+    def write(self, repo: Dict[str, Any]) -> None:
+        if self.json_lines:
+            self._file.write(json.dumps(repo, ensure_ascii=False, separators=(',', ':'),
+                                        sort_keys=self.sort_keys) + '\n')
+        elif self.indent is None:
+            self._file.write((',' if self.count else '') + json.dumps(repo, ensure_ascii=False, separators=(',', ':'),
+                                                                      sort_keys=self.sort_keys))
+        else:
+            pad = ' ' * self.indent
+            encoded = json.dumps(repo, indent=self.indent, ensure_ascii=False,
+                                 sort_keys=self.sort_keys).replace('\n', '\n' + pad)
+            self._file.write((',\n' if self.count else '\n') + pad + encoded)
+        self.count += 1
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if not self.json_lines:
+            self._file.write('\n]' if self.count and self.indent is not None else ']')
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.file_path)
+        else:
+            os.remove(self._tmp_path)
+
+def save_repositories_streaming(repositories: Iterable[Dict[str, Any]],
+                                file_path: str = 'data/repositories.json',
+                                indent: Optional[int] = 2, sort_keys: bool = True) -> int:
+    """Write repositories from any iterable without materialising the full document.
     
-    # Quality score distribution
-    quality_scores = [repo.get('quality_score', 0) for repo in repositories]
-    avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+    Keys are sorted by default so the file does not change when only the
+    order of upstream fields does.
+    """
+    with RepositoryWriter(file_path, indent=indent, sort_keys=sort_keys) as writer:
+        for repo in repositories:
+            writer.write(repo)
+    logger.info(f"Saved {writer.count} repositories to {file_path}")
+    return writer.count
+
+class _Descending:
+    """Sort key wrapper that inverts the order of the wrapped value."""
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+    
+    def __eq__(self, other: '_Descending') -> bool:
+        return self.value == other.value
+    
+    def __lt__(self, other: '_Descending') -> bool:
+        return other.value < self.value
+
+def repository_sort_key(repo: Dict[str, Any]) -> Tuple:
+    """Published order: quality score and last update descending, then full name, then id."""
+    return (
+        _Descending((repo.get('quality_score', 0), repo.get('updated_at', ''))),
+        (repo.get('full_name') or '').lower(),
+        repo.get('id') or 0
+    )
+
+# Records a RepositorySpool holds in memory before writing a sorted run to disk
+SPOOL_RUN_SIZE = 500
+
+class RepositorySpool:
+    """Collect repositories in any order and read them back sorted, with bounded memory.
+    
+    Records are buffered until ``run_size`` have arrived, then the buffer is
+    sorted and written to a temporary JSON Lines run. ``merged()`` does an
+    external merge of the runs and the final buffer, so at most
+    ``run_size`` records plus one per run are in memory at a time. Runs are
+    deleted when the spool is closed.
+    
+    Usage::
+    
+        with RepositorySpool(repository_sort_key) as spool:
+            for page in pages:
+                spool.extend(page)
+            save_repositories_streaming(spool.merged())
+    """
+    
+    def __init__(self, key: Callable[[Dict[str, Any]], Any] = repository_sort_key,
+                 run_size: int = SPOOL_RUN_SIZE, directory: Optional[str] = None):
+        self.key = key
+        self.run_size = max(1, run_size)
+        self.directory = directory
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._runs: List[str] = []
+        self._run_dir: Optional[str] = None
+    
+    def __enter__(self) -> 'RepositorySpool':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def add(self, repo: Dict[str, Any]) -> None:
+        self._buffer.append(repo)
+        self.count += 1
+        if len(self._buffer) >= self.run_size:
+            self._write_run()
+    
+    def extend(self, repos: Iterable[Dict[str, Any]]) -> None:
+        for repo in repos:
+            self.add(repo)
+    
+    def _write_run(self) -> None:
+        if self._run_dir is None:
+            self._run_dir = tempfile.mkdtemp(prefix='repository-spool-', dir=self.directory)
+        path = os.path.join(self._run_dir, f'run-{len(self._runs):05d}.jsonl')
+        with RepositoryWriter(path) as writer:
+            for repo in sorted(self._buffer, key=self.key):
+                writer.write(repo)
+        self._runs.append(path)
+        self._buffer = []
+    
+    def merged(self) -> Iterator[Dict[str, Any]]:
+        """Yield every spooled repository in key order."""
+        buffered = sorted(self._buffer, key=self.key)
+        if not self._runs:
+            return iter(buffered)
+        return heapq.merge(*(iter_repositories(path) for path in self._runs), buffered, key=self.key)
+    
+    def close(self) -> None:
+        """Delete the on-disk runs and drop the buffer."""
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+        self._runs = []
+        self._buffer = []
+
+RUN_METADATA_FILE = 'data/run_metadata.json'
+
+def load_run_metadata(file_path: str = RUN_METADATA_FILE) -> Dict[str, Any]:
+    """Load the run metadata file (empty if missing or invalid)."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in {file_path}: {e}")
+        return {}
+
+def update_run_metadata(section: str, values: Dict[str, Any], file_path: str = RUN_METADATA_FILE) -> bool:
+    """Replace one script's section of the run metadata file.
     
-    # Recent activity (last 30 days)
-    recent_cutoff = datetime.now().replace(tzinfo=None)
-    recent_repos = 0
+    Timestamps and other values that change on every run are kept here
+    rather than in the data files, so unchanged data is written byte for byte.
+    """
+    try:
+        metadata = load_run_metadata(file_path)
+        metadata[section] = values
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, sort_keys=True)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update run metadata: {e}")
+        return False
+
+def repository_id(repo: Dict[str, Any]) -> Any:
+    """Sort key that orders repositories by id."""
+    return repo['id']
+
+def _unique_by_id(repositories: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Drop repeats of an id from a stream sorted by id, keeping the first."""
+    last = object()
     for repo in repositories:
-        try:
-            last_push = datetime.fromisoformat(repo.get('pushed_at', '').replace('Z', ''))
-            if (recent_cutoff - last_push).days <= 30:
-                recent_repos += 1
-        except (ValueError, TypeError):
-            pass
+        if repo['id'] != last:
+            last = repo['id']
+            yield repo
+
+def build_change_report(previous: Iterable[Dict[str, Any]], current: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compare two repository lists by id and list what was added, removed or changed.
+    
+    Changed repositories map to the sorted names of the fields that differ.
+    Both inputs are read once and sorted by id through a ``RepositorySpool``,
+    then merge-joined, so only the report itself is held in memory.
+    """
+    def label(repo: Dict[str, Any]) -> str:
+        return repo.get('full_name') or str(repo['id'])
+    
+    added = []
+    removed = []
+    changed = {}
+    unchanged = 0
+    with RepositorySpool(key=repository_id) as before, RepositorySpool(key=repository_id) as after:
+        before.extend(repo for repo in previous if 'id' in repo)
+        after.extend(repo for repo in current if 'id' in repo)
+        
+        old = _unique_by_id(before.merged())
+        new = _unique_by_id(after.merged())
+        old_repo = next(old, None)
+        new_repo = next(new, None)
+        while old_repo is not None or new_repo is not None:
+            if new_repo is None or (old_repo is not None and old_repo['id'] < new_repo['id']):
+                removed.append(label(old_repo))
+                old_repo = next(old, None)
+            elif old_repo is None or new_repo['id'] < old_repo['id']:
+                added.append(label(new_repo))
+                new_repo = next(new, None)
+            else:
+                fields = sorted(field for field in set(old_repo) | set(new_repo)
+                                if old_repo.get(field) != new_repo.get(field))
+                if fields:
+                    changed[label(new_repo)] = fields
+                else:
+                    unchanged += 1
+                old_repo = next(old, None)
+                new_repo = next(new, None)
     
     return {
-        'total_repositories': total_repos,
-        'featured_repositories': featured_repos,
-        'featured_percentage': round((featured_repos / total_repos) * 100, 1) if total_repos > 0 else 0,
-        'average_quality_score': round(avg_quality, 1),
-        'recently_active': recent_repos,
-        'languages': dict(sorted(languages.items(), key=lambda x: x[1], reverse=True)),
-        'organizations': dict(sorted(organizations.items(), key=lambda x: x[1], reverse=True))
+        'added': sorted(added),
+        'removed': sorted(removed),
+        'changed': dict(sorted(changed.items())),
+        'unchanged': unchanged
     }
 
-def validate_repository_data(repositories: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Validate repository data structure and content."""
-    validation_results = {
-        'valid': True,
-        'errors': [],
-        'warnings': [],
-        'statistics': {}
+def export_change_report(report: Dict[str, Any], output_file: str = 'data/change_report.json') -> bool:
+    """Write a per-repository change report."""
+    try:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Changes: {len(report['added'])} added, {len(report['removed'])} removed, "
+                    f"{len(report['changed'])} changed, {report['unchanged']} unchanged")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to export change report: {e}")
+        return False
+
+def project_repository(repo: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a full repository record to the fields the web pages read."""
+    projected = {}
+    for field, sub_fields in PUBLISHED_FIELDS.items():
+        if field not in repo:
+            continue
+        value = repo[field]
+        if sub_fields is not None and isinstance(value, dict):
+            value = {key: value[key] for key in sub_fields if key in value}
+        projected[field] = value
+    return projected
+
+def export_published_repositories(repositories: Iterable[Dict[str, Any]],
+                                  output_file: str = 'data/repositories.min.json',
+                                  raw_file: str = 'data/repositories.json',
+                                  report_file: str = 'data/published_size_report.json') -> bool:
+    """Write the compact published projection of the repository data plus a size report.
+    
+    Records are projected and written one at a time.
+    """
+    try:
+        with RepositoryWriter(output_file, indent=None) as writer:
+            for repo in repositories:
+                writer.write(project_repository(repo))
+        
+        published_bytes = os.path.getsize(output_file)
+        raw_bytes = os.path.getsize(raw_file) if os.path.exists(raw_file) else None
+        report = {
+            'repositories': writer.count,
+            'published_file': output_file,
+            'published_bytes': published_bytes,
+            'raw_file': raw_file,
+            'raw_bytes': raw_bytes,
+            'reduction_percent': round((1 - published_bytes / raw_bytes) * 100, 1) if raw_bytes else None
+        }
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        
+        if raw_bytes:
+            logger.info(f"Published {output_file}: {published_bytes:,} bytes "
+                        f"({report['reduction_percent']}% smaller than {raw_bytes:,} byte {raw_file})")
+        else:
+            logger.info(f"Published {output_file}: {published_bytes:,} bytes")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to export published repositories: {e}")
+        return False
+
+def slugify(value: str) -> str:
+    """Turn a facet value (organisation, language, tag) into a file-name slug."""
+    slug = re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-')
+    return slug or 'unnamed'
+
+def content_hash(data: bytes) -> str:
+    """Short content hash used to detect changed artifacts."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _write_api_file(path: str, payload: Any) -> Dict[str, Any]:
+    data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+    return {'bytes': len(data), 'hash': content_hash(data)}
+
+class _ShardSpool:
+    """Groups encoded records into named shards on disk, in arrival order.
+    
+    Lines are buffered in memory and appended to one temporary file per
+    shard whenever ``buffer_size`` lines are waiting, so memory depends on
+    the buffer size and the number of shards, not the number of records.
+    """
+    
+    def __init__(self, buffer_size: int = SPOOL_RUN_SIZE):
+        self.buffer_size = buffer_size
+        self.counts: Dict[Any, int] = {}
+        self._files: Dict[Any, str] = {}
+        self._buffers: Dict[Any, List[str]] = {}
+        self._buffered = 0
+        self._dir = tempfile.mkdtemp(prefix='api-shards-')
+    
+    def __enter__(self) -> '_ShardSpool':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        shutil.rmtree(self._dir, ignore_errors=True)
+    
+    def add(self, shard: Any, line: str) -> None:
+        if shard not in self._files:
+            self._files[shard] = os.path.join(self._dir, f'{len(self._files)}.jsonl')
+            self.counts[shard] = 0
+        self._buffers.setdefault(shard, []).append(line)
+        self.counts[shard] += 1
+        self._buffered += 1
+        if self._buffered >= self.buffer_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        for shard, lines in self._buffers.items():
+            with open(self._files[shard], 'a', encoding='utf-8', newline='') as f:
+                f.write(''.join(line + '\n' for line in lines))
+        self._buffers = {}
+        self._buffered = 0
+    
+    def write(self, shard: Any, path: str, prefix: str = '[', suffix: str = ']') -> Dict[str, Any]:
+        """Write a shard to ``path`` as ``prefix`` + comma-separated records + ``suffix``."""
+        self._flush()
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'wb') as out:
+            def emit(text: str) -> None:
+                nonlocal size
+                data = text.encode('utf-8')
+                out.write(data)
+                digest.update(data)
+                size += len(data)
+            
+            emit(prefix)
+            if shard in self._files:
+                with open(self._files[shard], 'r', encoding='utf-8', newline='') as f:
+                    for number, line in enumerate(f):
+                        emit((',' if number else '') + line[:-1])
+            emit(suffix)
+        return {'bytes': size, 'hash': digest.hexdigest()[:16]}
+
+def export_api_shards(repositories: Iterable[Dict[str, Any]], output_dir: str = 'data/api',
+                      page_size: int = 100) -> bool:
+    """Write a static, sharded JSON API of the published repository data.
+    
+    Produces paginated ``all/page-N.json`` files, one shard per organisation,
+    language and tag, and a ``manifest.json`` listing every file with its
+    repository count and content hash. Shards are grouped in a single pass
+    and keep the order of ``repositories``; records are spooled to disk per
+    shard as they arrive, so the full data set is never held in memory.
+    """
+    try:
+        facets: Dict[str, set] = {'organisations': set(), 'languages': set(), 'tags': set()}
+        
+        with _ShardSpool() as shards:
+            total = 0
+            for repo in repositories:
+                line = json.dumps(project_repository(repo), separators=(',', ':'), ensure_ascii=False)
+                shards.add(('all', total // page_size + 1), line)
+                total += 1
+                
+                org = repo.get('owner', {}).get('login')
+                values = {
+                    'organisations': [org] if org else [],
+                    'languages': [repo['language']] if repo.get('language') else [],
+                    'tags': dict.fromkeys(repo.get('all_tags') or [])
+                }
+                for facet, facet_values in values.items():
+                    for value in facet_values:
+                        facets[facet].add(value)
+                        shards.add((facet, value), line)
+            
+            # Remove shards left over from values that no longer exist
+            for directory in ['all'] + list(facets):
+                os.makedirs(os.path.join(output_dir, directory), exist_ok=True)
+                for stale in glob.glob(os.path.join(output_dir, directory, '*.json')):
+                    os.remove(stale)
+            
+            manifest = {
+                'total': total,
+                'page_size': page_size,
+                'pages': []
+            }
+            
+            page_count = max(1, -(-total // page_size))
+            for number in range(1, page_count + 1):
+                path = f'all/page-{number}.json'
+                # Same bytes as json.dumps({'page': ..., 'pages': ..., 'repositories': [...]}) with compact separators
+                info = shards.write(('all', number), os.path.join(output_dir, path),
+                                    prefix=f'{{"page":{number},"pages":{page_count},"repositories":[', suffix=']}')
+                manifest['pages'].append({'path': path, 'count': shards.counts.get(('all', number), 0), **info})
+            
+            for facet, groups in facets.items():
+                manifest[facet] = {}
+                used_slugs = {}
+                for value in sorted(groups, key=lambda value: (value.lower(), value)):
+                    slug = slugify(value)
+                    if slug in used_slugs and used_slugs[slug] != value:
+                        slug = f"{slug}-{content_hash(value.encode('utf-8'))[:6]}"
+                    used_slugs[slug] = value
+                    
+                    path = f'{facet}/{slug}.json'
+                    info = shards.write((facet, value), os.path.join(output_dir, path))
+                    manifest[facet][value] = {'path': path, 'count': shards.counts[(facet, value)], **info}
+        
+        with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'), ensure_ascii=False)
+        
+        shard_count = len(manifest['pages']) + sum(len(manifest[facet]) for facet in facets)
+        logger.info(f"Exported {shard_count} API shards to {output_dir}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to export API shards: {e}")
+        return False
+
+def _repository_facet_values(repo: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Facet values of a repository, derived the same way as the solutions page filters."""
+    tags = repo.get('all_tags') or (repo.get('topics') or []) + (repo.get('generated_tags') or [])
+    return {
+        'visibility': ['Internal' if repo.get('private') else 'Public'],
+        'language': [repo.get('language') or 'Unknown'],
+        'organisation': [map_organization_name(repo.get('owner', {}).get('login', ''))],
+        'tag': list(dict.fromkeys(tag for tag in tags if tag and tag.strip()))
     }
+
+def export_facet_index(repositories: Iterable[Dict[str, Any]], output_file: str = 'data/facet_index.json',
+                       published_file: str = 'data/repositories.min.json') -> bool:
+    """Write a posting-list index of every facet value for the solutions page filters.
+    
+    Each facet value maps to its base count and the sorted row numbers of the
+    matching repositories in ``published_file``, so filter counts can be
+    computed by intersecting lists instead of re-filtering every repository.
+    """
+    try:
+        facets: Dict[str, Dict[str, List[int]]] = {
+            'visibility': {}, 'language': {}, 'organisation': {}, 'tag': {}
+        }
+        ids = []
+        for row, repo in enumerate(repositories):
+            ids.append(repo.get('id'))
+            for facet, values in _repository_facet_values(repo).items():
+                for value in values:
+                    facets[facet].setdefault(value, []).append(row)
+        
+        source_hash = None
+        if os.path.exists(published_file):
+            digest = hashlib.sha256()
+            with open(published_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            source_hash = digest.hexdigest()[:16]
+        
+        index = {
+            'total': len(ids),
+            'source': published_file,
+            'source_hash': source_hash,
+            'ids': ids,
+            'facets': {
+                facet: {
+                    value: {'count': len(rows), 'rows': rows}
+                    for value, rows in sorted(values.items(), key=lambda item: (-len(item[1]), item[0].lower(), item[0]))
+                }
+                for facet, values in facets.items()
+            }
+        }
+        
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+        
+        logger.info(f"Facet index exported to {output_file} "
+                    f"({sum(len(values) for values in facets.values())} facet values)")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to export facet index: {e}")
+        return False
+
+# Day windows for the recent-activity counts; 30 days is reported as 'recently_active'
+ACTIVITY_WINDOWS = (30, 90, 365)
+
+REQUIRED_FIELDS = ['id', 'name', 'full_name', 'html_url', 'owner']
+ENHANCED_FIELDS = ['generated_tags', 'all_tags', 'quality_score', 'featured']
+
+# GitHub timestamps in this form compare correctly as strings, so they need no parsing
+_GITHUB_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+
+class RepositoryStatsAccumulator:
+    """Single-pass accumulator for repository statistics and validation findings.
     
-    required_fields = ['id', 'name', 'full_name', 'html_url', 'owner']
-    enhanced_fields = ['generated_tags', 'all_tags', 'quality_score', 'featured']
+    ``add`` folds one repository into the running counts, so the whole
+    dataset is scanned once for ``get_repository_stats``,
+    ``validate_repository_data`` and ``export_summary_report`` together. Two
+    accumulators built over consecutive chunks can be combined with
+    ``merge``; pass the chunk's starting position as ``index_offset`` so
+    validation messages keep their global repository numbers.
+    """
+    
+    def __init__(self, now: Optional[datetime] = None, index_offset: int = 0, featured_limit: int = 10):
+        self.now = (now or datetime.now()).replace(tzinfo=None)
+        self.index_offset = index_offset
+        self.featured_limit = featured_limit
+        
+        self.total = 0
+        self.featured = 0
+        self.quality_total = 0
+        self.languages: Dict[str, int] = {}
+        self.organizations: Dict[str, int] = {}
+        self.activity = {days: 0 for days in ACTIVITY_WINDOWS}
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+        self.featured_repositories: List[Dict[str, Any]] = []
+        
+        # A push is within N days when (now - pushed_at).days <= N, i.e. after now - (N + 1) days
+        self._cutoffs = {days: self.now - timedelta(days=days + 1) for days in ACTIVITY_WINDOWS}
+        self._cutoff_strings = {days: cutoff.strftime('%Y-%m-%dT%H:%M:%SZ') for days, cutoff in self._cutoffs.items()}
+    
+    def _count_activity(self, pushed_at: Any) -> None:
+        if isinstance(pushed_at, str) and _GITHUB_TIMESTAMP.match(pushed_at):
+            for days, cutoff in self._cutoff_strings.items():
+                if pushed_at > cutoff:
+                    self.activity[days] += 1
+            return
+        try:
+            last_push = datetime.fromisoformat((pushed_at or '').replace('Z', ''))
+            for days in ACTIVITY_WINDOWS:
+                if (self.now - last_push).days <= days:
+                    self.activity[days] += 1
+        except (ValueError, TypeError, AttributeError):
+            pass
     
-    for i, repo in enumerate(repositories):
-        repo_name = repo.get('name', f'Repository {i}')
+    def _validate(self, repo: Dict[str, Any], index: int) -> None:
+        repo_name = repo.get('name', f'Repository {index}')
         
         # Check required fields
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if field not in repo:
-                validation_results['errors'].append(f"{repo_name}: Missing required field '{field}'")
-                validation_results['valid'] = False
+                self.errors.append(f"{repo_name}: Missing required field '{field}'")
         
         # Check enhanced fields
-        for field in enhanced_fields:
+        for field in ENHANCED_FIELDS:
             if field not in repo:
-                validation_results['warnings'].append(f"{repo_name}: Missing enhanced field '{field}'")
+                self.warnings.append(f"{repo_name}: Missing enhanced field '{field}'")
         
         # Validate quality score
         quality_score = repo.get('quality_score')
         if quality_score is not None:
             if not isinstance(quality_score, (int, float)) or not (0 <= quality_score <= 100):
-                validation_results['errors'].append(f"{repo_name}: Invalid quality_score '{quality_score}'")
-                validation_results['valid'] = False
+                self.errors.append(f"{repo_name}: Invalid quality_score '{quality_score}'")
         
         # Validate featured status
         featured = repo.get('featured')
         if featured is not None and not isinstance(featured, bool):
-            validation_results['errors'].append(f"{repo_name}: Invalid featured status '{featured}'")
-            validation_results['valid'] = False
+            self.errors.append(f"{repo_name}: Invalid featured status '{featured}'")
     
-    validation_results['statistics'] = get_repository_stats(repositories)
+    def add(self, repo: Dict[str, Any]) -> None:
+        """Fold one repository into the statistics and validation results."""
+        self._validate(repo, self.index_offset + self.total)
+        self.total += 1
+        
+        if repo.get('featured'):
+            self.featured += 1
+            if len(self.featured_repositories) < self.featured_limit:
+                self.featured_repositories.append({
+                    'name': repo['name'],
+                    'organization': map_organization_name(repo.get('owner', {}).get('login', '')),
+                    'quality_score': repo.get('quality_score', 0),
+                    'url': repo.get('html_url', ''),
+                    'tags': repo.get('all_tags', [])[:5]  # First 5 tags
+                })
+        
+        lang = repo.get('language')
+        if lang:
+            self.languages[lang] = self.languages.get(lang, 0) + 1
+        
+        org = repo.get('owner', {}).get('login')
+        if org:
+            self.organizations[org] = self.organizations.get(org, 0) + 1
+        
+        self.quality_total += repo.get('quality_score', 0)
+        self._count_activity(repo.get('pushed_at', ''))
+    
+    def add_all(self, repositories: Iterable[Dict[str, Any]]) -> 'RepositoryStatsAccumulator':
+        for repo in repositories:
+            self.add(repo)
+        return self
+    
+    def merge(self, other: 'RepositoryStatsAccumulator') -> 'RepositoryStatsAccumulator':
+        """Combine with the accumulator of the chunk that follows this one."""
+        self.total += other.total
+        self.featured += other.featured
+        self.quality_total += other.quality_total
+        for lang, count in other.languages.items():
+            self.languages[lang] = self.languages.get(lang, 0) + count
+        for org, count in other.organizations.items():
+            self.organizations[org] = self.organizations.get(org, 0) + count
+        for days, count in other.activity.items():
+            self.activity[days] += count
+        self.errors.extend(other.errors)
+        self.warnings.extend(other.warnings)
+        remaining = self.featured_limit - len(self.featured_repositories)
+        self.featured_repositories.extend(other.featured_repositories[:max(remaining, 0)])
+        return self
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistics in the form returned by ``get_repository_stats``."""
+        if not self.total:
+            return {}
+        
+        return {
+            'total_repositories': self.total,
+            'featured_repositories': self.featured,
+            'featured_percentage': round((self.featured / self.total) * 100, 1),
+            'average_quality_score': round(self.quality_total / self.total, 1),
+            'recently_active': self.activity[30],
+            'activity_windows': {f'{days}_days': count for days, count in self.activity.items()},
+            'languages': dict(sorted(self.languages.items(), key=lambda x: x[1], reverse=True)),
+            'organizations': dict(sorted(self.organizations.items(), key=lambda x: x[1], reverse=True))
+        }
     
-    return validation_results
+    def validation(self) -> Dict[str, Any]:
+        """Validation results in the form returned by ``validate_repository_data``."""
+        return {
+            'valid': not self.errors,
+            'errors': list(self.errors),
+            'warnings': list(self.warnings),
+            'statistics': self.stats()
+        }
+
+def compute_repository_stats(repositories: Iterable[Dict[str, Any]],
+                             now: Optional[datetime] = None) -> RepositoryStatsAccumulator:
+    """Scan repositories (a list or a stream) once and return the filled accumulator."""
+    return RepositoryStatsAccumulator(now=now).add_all(repositories)
+
+def get_repository_stats(repositories: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Calculate statistics about the repository collection."""
+    return compute_repository_stats(repositories).stats()
+
+def validate_repository_data(repositories: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate repository data structure and content."""
+    return compute_repository_stats(repositories).validation()
 
 def map_organization_name(org_login: str) -> str:
     """Map GitHub organization login to full display name."""
@@ -164,26 +862,22 @@ def map_organization_name(org_login: str) -> str:
     }
     return org_mapping.get(org_login, org_login.replace('-', ' '))
 
-def export_summary_report(repositories: List[Dict[str, Any]], output_file: str = 'data/summary_report.json') -> bool:
-    """Export a summary report of the repository data."""
+def export_summary_report(repositories: Iterable[Dict[str, Any]], output_file: str = 'data/summary_report.json',
+                          accumulator: Optional[RepositoryStatsAccumulator] = None) -> bool:
+    """Export a summary report of the repository data.
+    
+    Pass an already-filled ``accumulator`` to reuse its single pass instead
+    of scanning ``repositories`` again.
+    """
     try:
-        stats = get_repository_stats(repositories)
-        validation = validate_repository_data(repositories)
+        if accumulator is None:
+            accumulator = compute_repository_stats(repositories)
         
         summary = {
             'generated_at': datetime.now().isoformat(),
-            'statistics': stats,
-            'validation': validation,
-            'featured_repositories': [
-                {
-                    'name': repo['name'],
-                    'organization': map_organization_name(repo.get('owner', {}).get('login', '')),
-                    'quality_score': repo.get('quality_score', 0),
-                    'url': repo.get('html_url', ''),
-                    'tags': repo.get('all_tags', [])[:5]  # First 5 tags
-                }
-                for repo in repositories if repo.get('featured')
-            ][:10]  # Top 10 featured
+            'statistics': accumulator.stats(),
+            'validation': accumulator.validation(),
+            'featured_repositories': accumulator.featured_repositories  # Top 10 featured
         }
         
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -196,3 +890,126 @@ def export_summary_report(repositories: List[Dict[str, Any]], output_file: str =
     except Exception as e:
         logger.error(f"Failed to export summary report: {e}")
         return False
+
+# Field weights for search ranking: a match in the name counts more than one in the description
+SEARCH_FIELD_BOOSTS = {
+    'name': 3.0,
+    'topics': 2.0,
+    'all_tags': 1.5,
+    'description': 1.0
+}
+
+SEARCH_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with'
+}
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms, breaking camelCase, kebab-case and snake_case."""
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text or '')
+    return [token for token in re.findall(r'[a-z0-9#+]+', text.lower())
+            if token not in SEARCH_STOPWORDS]
+
+def trigrams(term: str) -> List[str]:
+    """Padded character trigrams of a term, used for typo-tolerant matching."""
+    padded = f' {term} '
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+def build_search_index(repositories: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build an inverted index over name, description, topics and tags.
+    
+    Postings are ``[row, weight]`` pairs where ``row`` is the position in
+    the published data and ``weight`` is the boosted term frequency summed
+    over fields. Terms are stored once in a sorted vocabulary (so prefix
+    lookups are a binary search) and the trigram table maps each trigram to
+    vocabulary positions for fuzzy matching.
+    """
+    postings: Dict[str, Dict[int, float]] = {}
+    ids = []
+    
+    for row, repo in enumerate(repositories):
+        ids.append(repo.get('id'))
+        fields = {
+            'name': repo.get('name') or '',
+            'description': repo.get('description') or '',
+            'topics': ' '.join(repo.get('topics') or []),
+            'all_tags': ' '.join(repo.get('all_tags') or [])
+        }
+        for field, text in fields.items():
+            for term in tokenize(text):
+                doc_weights = postings.setdefault(term, {})
+                doc_weights[row] = doc_weights.get(row, 0) + SEARCH_FIELD_BOOSTS[field]
+    
+    vocabulary = sorted(postings)
+    trigram_table: Dict[str, List[int]] = {}
+    for position, term in enumerate(vocabulary):
+        for gram in trigrams(term):
+            trigram_table.setdefault(gram, []).append(position)
+    
+    return {
+        'total': len(ids),
+        'boosts': SEARCH_FIELD_BOOSTS,
+        'ids': ids,
+        'vocabulary': vocabulary,
+        'postings': [
+            [[row, round(weight, 2)] for row, weight in sorted(postings[term].items())]
+            for term in vocabulary
+        ],
+        'trigrams': dict(sorted(trigram_table.items()))
+    }
+
+def search_repositories(index: Dict[str, Any], query: str, limit: int = 20,
+                        fuzzy_threshold: float = 0.4) -> List[Tuple[int, float]]:
+    """Rank published rows for a query using a search index (reference implementation).
+    
+    Each query term matches exact vocabulary terms, then terms it is a prefix
+    of, then, if nothing matched, terms sharing enough trigrams (typos).
+    Scores are boosted weights scaled by inverse document frequency.
+    """
+    vocabulary = index['vocabulary']
+    total = max(index['total'], 1)
+    scores: Dict[int, float] = {}
+    
+    for token in tokenize(query):
+        matches: Dict[int, float] = {}
+        
+        start = bisect.bisect_left(vocabulary, token)
+        position = start
+        while position < len(vocabulary) and vocabulary[position].startswith(token):
+            matches[position] = 1.0 if vocabulary[position] == token else 0.7
+            position += 1
+        
+        if not matches:
+            query_grams = trigrams(token)
+            overlap: Dict[int, int] = {}
+            for gram in query_grams:
+                for candidate in index['trigrams'].get(gram, []):
+                    overlap[candidate] = overlap.get(candidate, 0) + 1
+            for candidate, shared in overlap.items():
+                similarity = shared / (len(query_grams) + len(trigrams(vocabulary[candidate])) - shared)
+                if similarity >= fuzzy_threshold:
+                    matches[candidate] = 0.5 * similarity
+        
+        for position, factor in matches.items():
+            term_postings = index['postings'][position]
+            idf = math.log(1 + total / len(term_postings))
+            for row, weight in term_postings:
+                scores[row] = scores.get(row, 0) + weight * idf * factor
+    
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
+
+def export_search_index(repositories: Iterable[Dict[str, Any]], output_file: str = 'data/search_index.json') -> bool:
+    """Export the prebuilt search index for the solutions page."""
+    try:
+        index = build_search_index(repositories)
+        
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+        
+        logger.info(f"Search index exported to {output_file} ({len(index['vocabulary'])} terms)")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to export search index: {e}")
+        return False
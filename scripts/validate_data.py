@@ -4,14 +4,18 @@ NHS Wales Solutions Exchange - Data Validation
 Script to validate repository data integrity and generate reports
 """
 
+import argparse
+import json
 import sys
 import logging
+from itertools import islice
 from pathlib import Path
 
 # Add scripts directory to path for imports
 sys.path.append(str(Path(__file__).parent))
 
-from utils import load_repositories, validate_repository_data, export_summary_report, get_repository_stats
+from utils import iter_repositories, export_summary_report, RepositoryStatsAccumulator, SPOOL_RUN_SIZE
+from profiling import StageProfiler, add_profile_arguments, profiler_from_args
 
 # Configure logging
 logging.basicConfig(
@@ -20,20 +24,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Validate repository data and export the summary report")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main validation routine."""
+    profiler = profiler_from_args(parse_args(argv), 'validate_data') or StageProfiler(enabled=False)
+    try:
+        valid = validate(profiler)
+    finally:
+        profiler.write()
+    sys.exit(0 if valid else 1)
+
+def validate(profiler: StageProfiler) -> bool:
+    """Validate the repository data and report on it, profiling each step if enabled."""
     logger.info("Starting NHS Wales Solutions Exchange data validation")
     
-    # Load repository data
-    repositories = load_repositories()
-    if not repositories:
+    # Stream the repository data in batches, validating and gathering statistics in a single pass;
+    # reading and validating each batch are profiled as separate stages
+    accumulator = RepositoryStatsAccumulator()
+    records = iter_repositories(strict=True)
+    try:
+        while True:
+            with profiler.stage('load'):
+                batch = list(islice(records, SPOOL_RUN_SIZE))
+            if not batch:
+                break
+            with profiler.stage('validate'):
+                accumulator.add_all(batch)
+    except json.JSONDecodeError:
+        accumulator = None
+    if accumulator is None or not accumulator.total:
         logger.error("No repository data found or failed to load")
-        sys.exit(1)
-    
-    logger.info(f"Loaded {len(repositories)} repositories")
+        return False
     
-    # Validate data
-    validation = validate_repository_data(repositories)
+    logger.info(f"Loaded {accumulator.total} repositories")
+    validation = accumulator.validation()
     
     # Report validation results
     if validation['valid']:
@@ -70,11 +99,12 @@ def main():
         logger.info(f"  Top Organizations: {', '.join([f'{org}({count})' for org, count in top_orgs])}")
     
     # Export summary report
-    if export_summary_report(repositories):
+    with profiler.stage('report'):
+        exported = export_summary_report((), accumulator=accumulator)
+    if exported:
         logger.info("📄 Summary report exported successfully")
     
-    # Exit with appropriate code
-    sys.exit(0 if validation['valid'] else 1)
+    return validation['valid']
 
 if __name__ == "__main__":
     main()